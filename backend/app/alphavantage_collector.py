@@ -4,25 +4,129 @@ Fetches stock data from Alpha Vantage API
 """
 
 import os
+import time
+import asyncio
+import threading
+from collections import deque
+from functools import lru_cache
+import aiohttp
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from app.cache import file_cache
+from app.utils.calculations import METRIC_DECIMALS, STORED_METRIC_COLUMNS, compute_metrics
+
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://www.alphavantage.co/query"
+
+# Free tier quota, shared by every request this process makes
+RATE_LIMIT_CALLS = 5
+RATE_LIMIT_PERIOD = 60
+
+
+class _CallBudget:
+    """
+    Sliding-window call quota shared by the sync and async request paths
+    
+    reserve() books the caller's send time and returns how long to wait
+    for it. Bookings happen under one lock, so threads (process_many)
+    and the event loop (fetch_many) draw on the same RATE_LIMIT_CALLS
+    per RATE_LIMIT_PERIOD; it only blocks once the quota is spent.
+    """
+    
+    def __init__(self, calls: int, period: float):
+        self.calls = calls
+        self.period = period
+        self._sent = deque()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and self._sent[0] <= now - self.period:
+                self._sent.popleft()
+            
+            send_at = now
+            if len(self._sent) >= self.calls:
+                send_at = max(now, self._sent[-self.calls] + self.period)
+            self._sent.append(send_at)
+            return send_at - now
+
+
+_budget = _CallBudget(RATE_LIMIT_CALLS, RATE_LIMIT_PERIOD)
+
+
+
+def _make_session() -> requests.Session:
+    """Keep-alive session with retries on server errors; the rate limiter paces 429s"""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET"]
+    )
+    session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry))
+    session.headers.update({'Accept-Encoding': 'gzip'})
+    return session
+
+
+_session = _make_session()
+
+
+def _get_json(params: Dict) -> Dict:
+    """Rate-limited GET of the Alpha Vantage endpoint"""
+    time.sleep(_budget.reserve())
+    response = _session.get(BASE_URL, params=params, timeout=30)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+def _overview_cache_key(symbol: str) -> str:
+    return file_cache.make_key(symbol, 'overview')
+
+
+@lru_cache(maxsize=512)
+def _fetch_overview(api_key: str, symbol: str) -> tuple:
+    """
+    OVERVIEW payload as a tuple of items, memoized for the process lifetime
+    
+    Raises LookupError when the API has no profile for the symbol, so
+    failed lookups are not memoized.
+    """
+    cache_key = _overview_cache_key(symbol)
+    data = file_cache.get_json('OVERVIEW', cache_key, AlphaVantageCollector.OVERVIEW_CACHE_TTL)
+    
+    if data is None:
+        data = _get_json({
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': api_key
+        })
+        if not data or 'Symbol' not in data:
+            raise LookupError(f"No overview data for {symbol}")
+        file_cache.set_json('OVERVIEW', cache_key, data)
+    
+    return tuple(data.items())
+
 
 class AlphaVantageCollector:
     """Handles data collection from Alpha Vantage API"""
     
-    BASE_URL = "https://www.alphavantage.co/query"
+    BASE_URL = BASE_URL
     
     
     API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'YOUR_API_KEY_HERE')
@@ -55,6 +159,13 @@ class AlphaVantageCollector:
         'LT.BSE': 'LT'
     }
     
+    # Concurrent symbols in flight for fetch_many
+    MAX_CONCURRENCY = 5
+    
+    # How long cached responses stay valid
+    DAILY_CACHE_TTL = timedelta(hours=1)
+    OVERVIEW_CACHE_TTL = timedelta(hours=24)
+    
     def __init__(self, api_key: str = None):
         """Initialize with API key"""
         self.api_key = api_key or self.API_KEY
@@ -65,6 +176,100 @@ class AlphaVantageCollector:
             logger.warning("Set ALPHA_VANTAGE_API_KEY in backend/.env file")
             logger.warning("Get free key: https://www.alphavantage.co/support/#api-key")
     
+    def _daily_params(self, symbol: str, outputsize: str) -> Dict:
+        return {
+            'function': 'TIME_SERIES_DAILY',
+            'symbol': symbol,
+            'outputsize': outputsize,
+            'apikey': self.api_key
+        }
+    
+    def _overview_params(self, symbol: str) -> Dict:
+        return {
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': self.api_key
+        }
+    
+    def _daily_cache_key(self, symbol: str, outputsize: str) -> str:
+        return file_cache.make_key(symbol, outputsize, 'daily')
+    
+    def _parse_daily(self, data: Dict, symbol: str) -> Optional[pd.DataFrame]:
+        """Convert a TIME_SERIES_DAILY payload into a DataFrame"""
+        # Check for errors
+        if 'Error Message' in data:
+            logger.error(f"❌ API Error: {data['Error Message']}")
+            return None
+        
+        if 'Note' in data:
+            logger.warning(f"⚠️  API Limit: {data['Note']}")
+            return None
+        
+        if 'Time Series (Daily)' not in data:
+            logger.error(f"❌ No data found for {symbol}")
+            logger.debug(f"Response keys: {data.keys()}")
+            return None
+        
+        # Parse data straight into typed arrays in one pass
+        time_series = data['Time Series (Daily)']
+        n = len(time_series)
+        
+        dates = np.empty(n, dtype='datetime64[D]')
+        opens = np.empty(n, dtype=np.float64)
+        highs = np.empty(n, dtype=np.float64)
+        lows = np.empty(n, dtype=np.float64)
+        closes = np.empty(n, dtype=np.float64)
+        volumes = np.empty(n, dtype=np.int64)
+        
+        for i, (day, bar) in enumerate(time_series.items()):
+            dates[i] = np.datetime64(day, 'D')
+            opens[i] = float(bar['1. open'])
+            highs[i] = float(bar['2. high'])
+            lows[i] = float(bar['3. low'])
+            closes[i] = float(bar['4. close'])
+            volumes[i] = int(bar['5. volume'])
+        
+        # API returns newest first; sort ascending once
+        order = np.argsort(dates, kind='stable')
+        
+        df = pd.DataFrame({
+            'date': dates[order],
+            'open': opens[order],
+            'high': highs[order],
+            'low': lows[order],
+            'close': closes[order],
+            'volume': volumes[order]
+        })
+        
+        logger.info(f"✅ Fetched {len(df)} records for {symbol}")
+        return df
+    
+    def _fallback_company_info(self, symbol: str) -> Dict:
+        """Basic company info used when the OVERVIEW call fails"""
+        clean_symbol = symbol.replace('.BSE', '').replace('.NSE', '')
+        name = self.STOCK_SYMBOLS.get(clean_symbol, f"{clean_symbol} Corporation")
+        return {
+            'symbol': clean_symbol,
+            'name': name,
+            'sector': 'Unknown',
+            'industry': 'Unknown',
+            'market_cap': 0
+        }
+    
+    def _parse_overview(self, data: Dict, symbol: str) -> Dict:
+        """Convert an OVERVIEW payload into the company info dict"""
+        if not data or 'Symbol' not in data:
+            # Return basic info if API call fails
+            return self._fallback_company_info(symbol)
+        
+        return {
+            'symbol': data.get('Symbol', symbol),
+            'name': data.get('Name', symbol),
+            'sector': data.get('Sector', 'Unknown'),
+            'industry': data.get('Industry', 'Unknown'),
+            'market_cap': float(data.get('MarketCapitalization', 0))
+        }
+    
     def fetch_daily_data(self, symbol: str, outputsize: str = 'compact') -> Optional[pd.DataFrame]:
         """
         Fetch daily time series data
@@ -76,56 +281,20 @@ class AlphaVantageCollector:
         Returns:
             DataFrame with stock data or None if failed
         """
+        cache_key = self._daily_cache_key(symbol, outputsize)
+        cached = file_cache.get('TIME_SERIES_DAILY', cache_key, self.DAILY_CACHE_TTL)
+        if cached is not None:
+            logger.info(f"💾 Using cached data for {symbol}")
+            return cached
+        
         try:
             logger.info(f"📊 Fetching data for {symbol} from Alpha Vantage...")
             
-            params = {
-                'function': 'TIME_SERIES_DAILY',
-                'symbol': symbol,
-                'outputsize': outputsize,
-                'apikey': self.api_key
-            }
-            
-            response = requests.get(self.BASE_URL, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Check for errors
-            if 'Error Message' in data:
-                logger.error(f"❌ API Error: {data['Error Message']}")
-                return None
-            
-            if 'Note' in data:
-                logger.warning(f"⚠️  API Limit: {data['Note']}")
-                return None
-            
-            if 'Time Series (Daily)' not in data:
-                logger.error(f"❌ No data found for {symbol}")
-                logger.debug(f"Response keys: {data.keys()}")
-                return None
-            
-            # Parse data
-            time_series = data['Time Series (Daily)']
+            data = _get_json(self._daily_params(symbol, outputsize))
+            df = self._parse_daily(data, symbol)
             
-            # Convert to DataFrame
-            df = pd.DataFrame.from_dict(time_series, orient='index')
-            df.index = pd.to_datetime(df.index)
-            df = df.sort_index()
-            
-            # Rename columns
-            df.columns = ['open', 'high', 'low', 'close', 'volume']
-            
-            # Convert to numeric
-            for col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Reset index to make date a column
-            df.reset_index(inplace=True)
-            df.rename(columns={'index': 'date'}, inplace=True)
-            df['date'] = df['date'].dt.date
-            
-            logger.info(f"✅ Fetched {len(df)} records for {symbol}")
+            if df is not None:
+                file_cache.set('TIME_SERIES_DAILY', cache_key, df)
             return df
             
         except requests.exceptions.RequestException as e:
@@ -140,54 +309,80 @@ class AlphaVantageCollector:
         Get company overview/information
         """
         try:
-            params = {
-                'function': 'OVERVIEW',
-                'symbol': symbol,
-                'apikey': self.api_key
-            }
+            data = dict(_fetch_overview(self.api_key, symbol))
+            return self._parse_overview(data, symbol)
+            
+        except LookupError:
+            # Return basic info if API has no profile
+            return self._fallback_company_info(symbol)
+        except Exception as e:
+            logger.error(f"Error fetching company info: {str(e)}")
+            return self._fallback_company_info(symbol)
+    
+    async def _fetch_json(self, session: aiohttp.ClientSession, params: Dict) -> Dict:
+        """Rate-limited GET of the Alpha Vantage endpoint on a shared session"""
+        await asyncio.sleep(_budget.reserve())
+        async with session.get(self.BASE_URL, params=params) as response:
+            response.raise_for_status()
+            return orjson.loads(await response.read())
+    
+    async def fetch_daily_data_async(
+        self,
+        session: aiohttp.ClientSession,
+        symbol: str,
+        outputsize: str = 'compact'
+    ) -> Optional[pd.DataFrame]:
+        """Async variant of fetch_daily_data for use inside fetch_many"""
+        cache_key = self._daily_cache_key(symbol, outputsize)
+        cached = file_cache.get('TIME_SERIES_DAILY', cache_key, self.DAILY_CACHE_TTL)
+        if cached is not None:
+            logger.info(f"💾 Using cached data for {symbol}")
+            return cached
+        
+        try:
+            logger.info(f"📊 Fetching data for {symbol} from Alpha Vantage...")
+            data = await self._fetch_json(session, self._daily_params(symbol, outputsize))
+            df = self._parse_daily(data, symbol)
             
-            response = requests.get(self.BASE_URL, params=params, timeout=30)
-            data = response.json()
+            if df is not None:
+                file_cache.set('TIME_SERIES_DAILY', cache_key, df)
+            return df
             
-            if not data or 'Symbol' not in data:
-                # Return basic info if API call fails
-                clean_symbol = symbol.replace('.BSE', '').replace('.NSE', '')
-                name = self.STOCK_SYMBOLS.get(clean_symbol, f"{clean_symbol} Corporation")
-                return {
-                    'symbol': clean_symbol,
-                    'name': name,
-                    'sector': 'Unknown',
-                    'industry': 'Unknown',
-                    'market_cap': 0
-                }
+        except aiohttp.ClientError as e:
+            logger.error(f"❌ Network error fetching {symbol}: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Error fetching {symbol}: {str(e)}")
+            return None
+    
+    async def get_company_info_async(self, session: aiohttp.ClientSession, symbol: str) -> Dict:
+        """Async variant of get_company_info for use inside fetch_many"""
+        cache_key = _overview_cache_key(symbol)
+        cached = file_cache.get_json('OVERVIEW', cache_key, self.OVERVIEW_CACHE_TTL)
+        if cached is not None:
+            return self._parse_overview(cached, symbol)
+        
+        try:
+            data = await self._fetch_json(session, self._overview_params(symbol))
             
-            return {
-                'symbol': data.get('Symbol', symbol),
-                'name': data.get('Name', symbol),
-                'sector': data.get('Sector', 'Unknown'),
-                'industry': data.get('Industry', 'Unknown'),
-                'market_cap': float(data.get('MarketCapitalization', 0))
-            }
+            if data and 'Symbol' in data:
+                file_cache.set_json('OVERVIEW', cache_key, data)
+            return self._parse_overview(data, symbol)
             
         except Exception as e:
             logger.error(f"Error fetching company info: {str(e)}")
-            clean_symbol = symbol.replace('.BSE', '').replace('.NSE', '')
-            name = self.STOCK_SYMBOLS.get(clean_symbol, f"{clean_symbol} Corporation")
-            return {
-                'symbol': clean_symbol,
-                'name': name,
-                'sector': 'Unknown',
-                'industry': 'Unknown',
-                'market_cap': 0
-            }
+            return self._fallback_company_info(symbol)
     
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Clean and prepare data"""
+        """
+        Clean and prepare data
+        
+        Works in place: the caller hands over ownership of df, as
+        process_stock does with the frame fetch_daily_data just built.
+        """
         if df is None or df.empty:
             return pd.DataFrame()
         
-        df = df.copy()
-        
         # Handle missing values
         df.ffill(inplace=True)
         df.bfill(inplace=True)
@@ -201,31 +396,40 @@ class AlphaVantageCollector:
         return df
     
     def calculate_metrics(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate technical indicators and metrics"""
-        if df.empty:
-            return df
-        
-        df = df.copy()
-        
-        # Daily Return
-        df['daily_return'] = ((df['close'] - df['open']) / df['open'] * 100).round(4)
-        
-        # Moving Averages
-        df['ma7'] = df['close'].rolling(window=7, min_periods=1).mean().round(2)
-        df['ma30'] = df['close'].rolling(window=30, min_periods=1).mean().round(2)
+        """
+        Calculate technical indicators and metrics
         
-        # Volatility
-        df['volatility'] = df['daily_return'].rolling(window=20, min_periods=1).std().round(4)
+        Adds the metric columns to df in place and returns it. Metrics are
+        computed in float64 and stored as float32; see widen_metrics.
+        Frames that already carry the stored metrics are returned as-is.
+        """
+        if df.empty or STORED_METRIC_COLUMNS.issubset(df.columns):
+            return df
         
-        # Momentum Score
-        df['momentum_score'] = ((df['close'] - df['ma30']) / df['ma30'] * 100).round(2)
+        metrics = compute_metrics(
+            df['open'].to_numpy(),
+            df['close'].to_numpy(),
+            df['volume'].to_numpy()
+        )
         
-        # Volume Trend
-        avg_volume = df['volume'].rolling(window=20, min_periods=1).mean()
-        df['volume_trend'] = ((df['volume'] - avg_volume) / avg_volume * 100).round(2)
+        # Rounded values fit in float32; halves the frame's metric bytes
+        for column in METRIC_DECIMALS:
+            df[column] = metrics[column].astype(np.float32)
         
         return df
     
+    def calculate_stats(self, df: pd.DataFrame) -> Dict:
+        """Summary statistics over the processed data"""
+        return {
+            'week52_high': float(df['high'].max()),
+            'week52_low': float(df['low'].min()),
+            'avg_close': float(df['close'].mean()),
+            'current_price': float(df.iloc[-1]['close']),
+            'total_volume': int(df['volume'].sum()),
+            'avg_daily_return': float(df['daily_return'].mean()),
+            'volatility': float(df['daily_return'].std())
+        }
+    
     def process_stock(self, symbol: str, outputsize: str = 'compact') -> tuple:
         """
         Complete pipeline: fetch, clean, calculate metrics
@@ -254,21 +458,90 @@ class AlphaVantageCollector:
         company_info = self.get_company_info(symbol)
         
         # Calculate statistics
-        stats = {
-            'week52_high': float(df['high'].max()),
-            'week52_low': float(df['low'].min()),
-            'avg_close': float(df['close'].mean()),
-            'current_price': float(df.iloc[-1]['close']),
-            'total_volume': int(df['volume'].sum()),
-            'avg_daily_return': float(df['daily_return'].mean()),
-            'volatility': float(df['daily_return'].std())
-        }
+        stats = self.calculate_stats(df)
         
-        
-        time.sleep(12)  
+        return df, company_info, stats
+    
+    async def _process_one(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        symbol: str,
+        outputsize: str
+    ) -> tuple:
+        """process_stock pipeline for one symbol on a shared session"""
+        async with semaphore:
+            df = await self.fetch_daily_data_async(session, symbol, outputsize)
+            if df is None or df.empty:
+                return None, None, None
+            
+            df = self.clean_data(df)
+            if df.empty:
+                return None, None, None
+            
+            df = self.calculate_metrics(df)
+            company_info = await self.get_company_info_async(session, symbol)
+            stats = self.calculate_stats(df)
         
         return df, company_info, stats
+    
+    async def fetch_many(self, symbols: List[str], outputsize: str = 'compact') -> Dict[str, tuple]:
+        """
+        Run the process_stock pipeline for several symbols concurrently
+        
+        Requests share one connection pool and at most MAX_CONCURRENCY
+        symbols are in flight at a time.
+        
+        Returns:
+            Dict mapping symbol to (dataframe, company_info, stats)
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=30)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*[
+                self._process_one(session, semaphore, symbol, outputsize)
+                for symbol in symbols
+            ])
+        
+        return dict(zip(symbols, results))
+    
+    def process_many(self, symbols: List[str], outputsize: str = 'compact') -> Dict[str, tuple]:
+        """
+        Threaded process_stock over several symbols
+        
+        Synchronous counterpart of fetch_many. Every worker goes through
+        the same rate-limited _get_json, so the batch as a whole stays
+        within the API quota.
+        
+        Returns:
+            Dict mapping symbol to (dataframe, company_info, stats)
+        """
+        results = {}
+        
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self.process_stock, symbol, outputsize): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Error processing {symbol}: {str(e)}")
+                    results[symbol] = (None, None, None)
+        
+        return {symbol: results[symbol] for symbol in symbols}
 
 
 
-alphavantage_collector = AlphaVantageCollector()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_collector() -> AlphaVantageCollector:
+    """
+    Shared collector for this process, created on first use
+    
+    Works as a FastAPI dependency: Depends(get_collector)
+    """
+    return AlphaVantageCollector()
\ No newline at end of file
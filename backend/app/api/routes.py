@@ -4,19 +4,25 @@ Implements all REST endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from fastapi_cache.decorator import cache
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 import logging
 import numpy as np
+import pandas as pd
 
 from app.database import get_db
 from app.models import Company, StockData
 from app.models import (
     CompanyResponse, StockDataResponse, SummaryResponse,
-    CompareResponse, TopMoversResponse, MoverResponse
+    CompareResponse, TopMoversResponse
 )
 from app.data_collector import data_collector
+from app.utils.calculations import compute_technicals, widen_metrics
+from app.utils.records import df_to_records_fast
 
 
 try:
@@ -29,6 +35,10 @@ except ImportError:
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Response field order, used to build rows without pydantic
+STOCK_DATA_FIELDS = list(StockDataResponse.model_fields)
+COMPANY_FIELDS = list(CompanyResponse.model_fields)
+
 
 @router.get("/companies", response_model=List[CompanyResponse])
 async def get_companies(
@@ -42,22 +52,30 @@ async def get_companies(
     - sector: Filter by sector (optional)
     """
     try:
-        query = db.query(Company)
+        query = db.query(
+            Company.symbol,
+            Company.name,
+            Company.sector,
+            Company.industry,
+            Company.market_cap
+        )
         
         if sector:
             query = query.filter(Company.sector == sector)
         
-        companies = query.all()
+        companies = [row._asdict() for row in query.all()]
         
         
         if not companies:
-            default_companies = []
-            for symbol in data_collector.INDIAN_STOCKS[:10]:
-                company_info = data_collector.get_company_info(symbol)
-                default_companies.append(CompanyResponse(**company_info))
-            return default_companies
+            for company_info in data_collector.get_company_info_many(data_collector.INDIAN_STOCKS[:10]):
+                companies.append({field: company_info.get(field) for field in COMPANY_FIELDS})
+        
+        # Trusted rows: serialize plain dicts, skip per-row validation
+        for company in companies:
+            if company['market_cap'] is not None:
+                company['market_cap'] = float(company['market_cap'])
         
-        return companies
+        return ORJSONResponse(content=companies)
     
     except Exception as e:
         logger.error(f"Error fetching companies: {str(e)}")
@@ -86,51 +104,53 @@ async def get_stock_data(
             
             if df is not None and not df.empty:
                
-                response_data = []
-                for _, row in df.iterrows():
-                    response_data.append(StockDataResponse(
-                        date=str(row['date']),
-                        open=float(row['open']),
-                        high=float(row['high']),
-                        low=float(row['low']),
-                        close=float(row['close']),
-                        volume=int(row['volume']),
-                        daily_return=float(row.get('daily_return', 0)),
-                        ma7=float(row.get('ma7', 0)),
-                        ma30=float(row.get('ma30', 0))
-                    ))
+                # Trusted pipeline output: serialize plain dicts, skip per-row validation
+                frame = widen_metrics(df.reindex(columns=STOCK_DATA_FIELDS, fill_value=0)).astype({
+                    'date': str, 'open': float, 'high': float, 'low': float, 'close': float,
+                    'volume': int, 'daily_return': float, 'ma7': float, 'ma30': float
+                })
+                response_data = df_to_records_fast(frame, STOCK_DATA_FIELDS)
                 
                 logger.info(f"Served {len(response_data)} records from {source}")
-                return response_data
+                return ORJSONResponse(content=response_data)
         
        
         cutoff_date = datetime.now().date() - timedelta(days=days)
         
-        stock_data = db.query(StockData).filter(
+        # Scalar columns only; skips ORM entity hydration
+        stock_data = db.query(
+            StockData.date,
+            StockData.open,
+            StockData.high,
+            StockData.low,
+            StockData.close,
+            StockData.volume,
+            StockData.daily_return,
+            StockData.ma7,
+            StockData.ma30
+        ).filter(
             StockData.symbol == symbol,
             StockData.date >= cutoff_date
-        ).order_by(StockData.date.desc()).all()
+        ).order_by(StockData.date.desc()).limit(days).all()
         
         if not stock_data:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         
         
-        response_data = []
-        for record in stock_data:
-            response_data.append(StockDataResponse(
-                date=str(record.date), 
-                open=float(record.open),
-                high=float(record.high),
-                low=float(record.low),
-                close=float(record.close),
-                volume=int(record.volume),
-                daily_return=float(record.daily_return) if record.daily_return else 0.0,
-                ma7=float(record.ma7) if record.ma7 else 0.0,
-                ma30=float(record.ma30) if record.ma30 else 0.0
-            ))
+        response_data = [{
+            'date': str(record.date),
+            'open': float(record.open),
+            'high': float(record.high),
+            'low': float(record.low),
+            'close': float(record.close),
+            'volume': int(record.volume),
+            'daily_return': float(record.daily_return) if record.daily_return else 0.0,
+            'ma7': float(record.ma7) if record.ma7 else 0.0,
+            'ma30': float(record.ma30) if record.ma30 else 0.0
+        } for record in stock_data]
         
         logger.info(f"Served {len(response_data)} records from database")
-        return response_data[:days]
+        return ORJSONResponse(content=response_data)
     
     except HTTPException:
         raise
@@ -140,6 +160,7 @@ async def get_stock_data(
 
 
 @router.get("/summary/{symbol}", response_model=SummaryResponse)
+@cache(expire=300)
 async def get_stock_summary(
     symbol: str,
     db: Session = Depends(get_db)
@@ -162,25 +183,54 @@ async def get_stock_summary(
     try:
       
         one_year_ago = datetime.now().date() - timedelta(days=365)
-        
-        stock_data = db.query(StockData).filter(
+        in_range = (
             StockData.symbol == symbol,
             StockData.date >= one_year_ago
-        ).order_by(StockData.date).all()
+        )
         
-        if not stock_data:
+        # Only non-zero returns count towards volatility, as before
+        nonzero_return = case((StockData.daily_return != 0, StockData.daily_return))
+        
+        stats = db.query(
+            func.count(StockData.id).label('count'),
+            func.max(StockData.high).label('week52_high'),
+            func.min(StockData.low).label('week52_low'),
+            func.avg(StockData.close).label('avg_close'),
+            func.sum(StockData.volume).label('total_volume'),
+            func.avg(nonzero_return).label('return_mean'),
+            func.avg(nonzero_return * nonzero_return).label('return_sq_mean')
+        ).filter(*in_range).one()
+        
+        if not stats.count:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         
-       
-        closes = [d.close for d in stock_data]
-        highs = [d.high for d in stock_data]
-        lows = [d.low for d in stock_data]
-        returns = [d.daily_return for d in stock_data if d.daily_return]
+        current_price = db.query(StockData.close).filter(
+            *in_range
+        ).order_by(StockData.date.desc()).limit(1).scalar()
+        
+        last_return = db.query(StockData.daily_return).filter(
+            *in_range,
+            StockData.daily_return != 0
+        ).order_by(StockData.date.desc()).limit(1).scalar()
+        
+        # Population std of returns from E[x^2] - E[x]^2
+        if stats.return_mean is not None:
+            variance = stats.return_sq_mean - stats.return_mean ** 2
+            volatility = float(np.sqrt(max(variance, 0.0)))
+        else:
+            volatility = 0.0
         
        
-        if len(closes) > 20:
-            recent_avg = sum(closes[-20:]) / 20
-            older_avg = sum(closes[:20]) / 20
+        if stats.count > 20:
+            recent = db.query(StockData.close).filter(
+                *in_range
+            ).order_by(StockData.date.desc()).limit(20).subquery()
+            older = db.query(StockData.close).filter(
+                *in_range
+            ).order_by(StockData.date).limit(20).subquery()
+            
+            recent_avg = db.query(func.avg(recent.c.close)).scalar()
+            older_avg = db.query(func.avg(older.c.close)).scalar()
             if recent_avg > older_avg * 1.05:
                 trend = "bullish"
             elif recent_avg < older_avg * 0.95:
@@ -192,13 +242,13 @@ async def get_stock_summary(
         
         summary = SummaryResponse(
             symbol=symbol,
-            current_price=float(closes[-1]),
-            week52_high=float(max(highs)),
-            week52_low=float(min(lows)),
-            avg_close=float(sum(closes) / len(closes)),
-            total_volume=int(sum([d.volume for d in stock_data])),
-            volatility=float(np.std(returns)) if returns else 0.0,
-            daily_return=float(returns[-1]) if returns else 0.0,
+            current_price=float(current_price),
+            week52_high=float(stats.week52_high),
+            week52_low=float(stats.week52_low),
+            avg_close=float(stats.avg_close),
+            total_volume=int(stats.total_volume),
+            volatility=volatility,
+            daily_return=float(last_return) if last_return is not None else 0.0,
             trend=trend
         )
         
@@ -212,6 +262,7 @@ async def get_stock_summary(
 
 
 @router.get("/compare", response_model=CompareResponse)
+@cache(expire=300)
 async def compare_stocks(
     symbol1: str = Query(..., description="First stock symbol"),
     symbol2: str = Query(..., description="Second stock symbol"),
@@ -233,39 +284,49 @@ async def compare_stocks(
     """
     try:
        
-        cutoff_date = datetime.now().date() - timedelta(days=days)
-        
-       
-        data1 = db.query(StockData).filter(
-            StockData.symbol == symbol1,
-            StockData.date >= cutoff_date
-        ).order_by(StockData.date).all()
-        
+        # Both series in one round trip; data_service also fetches
+        # (and stores) a symbol the database doesn't have yet
+        if USE_DATA_SERVICE:
+            frames = data_service.get_many([symbol1, symbol2], days)
+        else:
+            cutoff_date = datetime.now().date() - timedelta(days=days)
+            rows = db.query(
+                StockData.symbol,
+                StockData.date,
+                StockData.close,
+                StockData.daily_return
+            ).filter(
+                StockData.symbol.in_([symbol1, symbol2]),
+                StockData.date >= cutoff_date
+            ).order_by(StockData.date).all()
+            
+            df = pd.DataFrame(rows, columns=['symbol', 'date', 'close', 'daily_return'])
+            frames = {symbol: group for symbol, group in df.groupby('symbol')}
         
-        data2 = db.query(StockData).filter(
-            StockData.symbol == symbol2,
-            StockData.date >= cutoff_date
-        ).order_by(StockData.date).all()
+        data1 = frames.get(symbol1)
+        data2 = frames.get(symbol2)
         
-        if not data1 or not data2:
+        if data1 is None or data2 is None or data1.empty or data2.empty:
             raise HTTPException(status_code=404, detail="Data not found for one or both symbols")
         
         
-        symbol1_return = ((data1[-1].close - data1[0].close) / data1[0].close * 100)
-        symbol2_return = ((data2[-1].close - data2[0].close) / data2[0].close * 100)
+        closes1 = data1['close'].to_numpy()
+        closes2 = data2['close'].to_numpy()
+        symbol1_return = float((closes1[-1] - closes1[0]) / closes1[0] * 100)
+        symbol2_return = float((closes2[-1] - closes2[0]) / closes2[0] * 100)
         
         
-        returns1 = [d.daily_return for d in data1 if d.daily_return]
-        returns2 = [d.daily_return for d in data2 if d.daily_return]
+        # Zero/missing returns are ignored, as before
+        returns1 = data1.set_index('date')['daily_return'].replace(0, np.nan)
+        returns2 = data2.set_index('date')['daily_return'].replace(0, np.nan)
         
-        symbol1_volatility = float(np.std(returns1)) if returns1 else 0.0
-        symbol2_volatility = float(np.std(returns2)) if returns2 else 0.0
+        symbol1_volatility = float(np.nan_to_num(returns1.std(ddof=0)))
+        symbol2_volatility = float(np.nan_to_num(returns2.std(ddof=0)))
         
         
-        if len(returns1) == len(returns2) and len(returns1) > 0:
-            correlation = float(np.corrcoef(returns1, returns2)[0, 1])
-        else:
-            correlation = 0.0
+        # Series.corr pairs returns by date, so gaps in either series are skipped
+        correlation = returns1.corr(returns2)
+        correlation = float(correlation) if np.isfinite(correlation) else 0.0
         
         
         better_performer = symbol1 if symbol1_return > symbol2_return else symbol2
@@ -291,6 +352,7 @@ async def compare_stocks(
 
 
 @router.get("/movers", response_model=TopMoversResponse)
+@cache(expire=300)
 async def get_top_movers(
     limit: int = Query(default=5, ge=1, le=10),
     db: Session = Depends(get_db)
@@ -305,40 +367,60 @@ async def get_top_movers(
         movers_data = []
         
        
-        companies = db.query(Company).all()
+        companies = db.query(Company.symbol, Company.name).order_by(Company.id).limit(15).all()
+        symbols = [company.symbol for company in companies]
+        
+        # Latest two bars per symbol in a single windowed query
+        ranked = db.query(
+            StockData.symbol,
+            StockData.close,
+            StockData.volume,
+            func.row_number().over(
+                partition_by=StockData.symbol,
+                order_by=StockData.date.desc()
+            ).label('rn')
+        ).filter(StockData.symbol.in_(symbols)).subquery()
+        
+        rows = db.query(
+            ranked.c.symbol,
+            ranked.c.close,
+            ranked.c.volume
+        ).filter(ranked.c.rn <= 2).order_by(ranked.c.symbol, ranked.c.rn).all()
+        
+        df = pd.DataFrame(rows, columns=['symbol', 'close', 'volume'])
+        latest = df.groupby('symbol').agg(
+            current_price=('close', 'first'),
+            previous_close=('close', 'last'),
+            volume=('volume', 'first'),
+            bars=('close', 'size')
+        )
+        latest = latest[latest['bars'] >= 2]
+        latest['change_percent'] = (
+            (latest['current_price'] - latest['previous_close']) / latest['previous_close'] * 100
+        )
         
-        for company in companies[:15]:  
-            try:
-               
-                recent_data = db.query(StockData).filter(
-                    StockData.symbol == company.symbol
-                ).order_by(StockData.date.desc()).limit(2).all()
-                
-                if len(recent_data) >= 2:
-                    latest = recent_data[0]
-                    previous = recent_data[1]
-                    
-                    change_percent = ((latest.close - previous.close) / previous.close * 100)
-                    
-                    movers_data.append(MoverResponse(
-                        symbol=company.symbol,
-                        name=company.name,
-                        current_price=float(latest.close),
-                        change_percent=round(change_percent, 2),
-                        volume=int(latest.volume)
-                    ))
-            except Exception as e:
-                logger.warning(f"Error processing {company.symbol}: {str(e)}")
+        for company in companies:
+            if company.symbol not in latest.index:
                 continue
+            
+            mover = latest.loc[company.symbol]
+            movers_data.append({
+                'symbol': company.symbol,
+                'name': company.name,
+                'current_price': float(mover['current_price']),
+                'change_percent': round(float(mover['change_percent']), 2),
+                'volume': int(mover['volume'])
+            })
         
        
-        movers_data.sort(key=lambda x: x.change_percent, reverse=True)
+        movers_data.sort(key=lambda x: x['change_percent'], reverse=True)
         
        
         gainers = movers_data[:limit]
         losers = movers_data[-limit:][::-1]
         
-        return TopMoversResponse(gainers=gainers, losers=losers)
+        # Plain dicts; response_model validates them once on the way out
+        return {'gainers': gainers, 'losers': losers}
     
     except Exception as e:
         logger.error(f"Error fetching top movers: {str(e)}")
@@ -346,6 +428,7 @@ async def get_top_movers(
 
 
 @router.get("/technicals/{symbol}")
+@cache(expire=300)
 async def get_technical_indicators(
     symbol: str,
     db: Session = Depends(get_db)
@@ -366,7 +449,12 @@ async def get_technical_indicators(
        
         six_months_ago = datetime.now().date() - timedelta(days=180)
         
-        stock_data = db.query(StockData).filter(
+        stock_data = db.query(
+            StockData.close,
+            StockData.high,
+            StockData.low,
+            StockData.daily_return
+        ).filter(
             StockData.symbol == symbol,
             StockData.date >= six_months_ago
         ).order_by(StockData.date).all()
@@ -374,54 +462,28 @@ async def get_technical_indicators(
         if not stock_data:
             raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
         
-        prices = [d.close for d in stock_data]
-        highs = [d.high for d in stock_data]
-        lows = [d.low for d in stock_data]
-        returns = [d.daily_return for d in stock_data if d.daily_return]
+        # None -> NaN, so rows with missing returns drop out below
+        prices, highs, lows, returns = np.array(stock_data, dtype=np.float64).T
+        returns = returns[np.isfinite(returns) & (returns != 0)]
         
-        
-        if len(returns) > 14:
-            gains = [r for r in returns[-14:] if r > 0]
-            losses = [abs(r) for r in returns[-14:] if r < 0]
-            avg_gain = sum(gains) / len(gains) if gains else 0
-            avg_loss = sum(losses) / len(losses) if losses else 0
-            rs = avg_gain / avg_loss if avg_loss > 0 else 100
-            rsi = 100 - (100 / (1 + rs))
-        else:
-            rsi = 50.0
-        
-        
-        macd_value = 0.0
-        if len(prices) > 26:
-            ema12 = sum(prices[-12:]) / 12
-            ema26 = sum(prices[-26:]) / 26
-            macd_value = ema12 - ema26
-        
-        
-        support = float(min(lows[-20:]) if len(lows) >= 20 else min(lows))
-        resistance = float(max(highs[-20:]) if len(highs) >= 20 else max(highs))
-        
-       
-        if len(prices) > 10:
-            recent_trend = (prices[-1] - prices[-10]) / 10
-            prediction = prices[-1] + recent_trend
-        else:
-            prediction = prices[-1]
+        rsi, macd_line, signal_line, histogram, support, resistance, prediction = compute_technicals(
+            prices, highs, lows, returns
+        )
         
         return {
             "symbol": symbol,
-            "rsi": round(rsi, 2),
+            "rsi": round(float(rsi), 2),
             "macd": {
-                "macd_line": round(macd_value, 2),
-                "signal_line": 0.0,
-                "histogram": 0.0
+                "macd_line": round(float(macd_line), 2),
+                "signal_line": round(float(signal_line), 2),
+                "histogram": round(float(histogram), 2)
             },
             "support_resistance": {
-                "support": round(support, 2),
-                "resistance": round(resistance, 2)
+                "support": round(float(support), 2),
+                "resistance": round(float(resistance), 2)
             },
-            "predicted_next_price": round(prediction, 2),
-            "current_price": round(prices[-1], 2)
+            "predicted_next_price": round(float(prediction), 2),
+            "current_price": round(float(prices[-1]), 2)
         }
     
     except HTTPException:
@@ -0,0 +1,194 @@
+"""
+Response caches
+FileCache stores upstream API results on disk (parquet for DataFrames,
+JSON for payloads) so repeated requests skip the network and the API
+quota; TTLCacheBackend holds rendered API responses in memory
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import orjson
+import pandas as pd
+from cachetools import TTLCache
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".fdp_cache"
+
+
+class FileCache:
+    """
+    TTL-bounded file cache
+
+    Entries live under {root}/{namespace}/{key}.parquet|.json and expire
+    based on file modification time. Set FDP_CACHE_DIR to move the cache,
+    or to an empty string to disable it.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        if root is None:
+            root = os.getenv('FDP_CACHE_DIR', str(DEFAULT_CACHE_DIR))
+        self.root = Path(root).expanduser() if root else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Stable key from request parameters"""
+        return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
+
+    def _path(self, namespace: str, key: str, suffix: str) -> Path:
+        return self.root / namespace / f"{key}{suffix}"
+
+    def _fresh(self, path: Path, ttl: timedelta) -> bool:
+        try:
+            age = time.time() - path.stat().st_mtime
+        except OSError:
+            return False
+        return age < ttl.total_seconds()
+
+    def _write(self, path: Path, write) -> None:
+        """Write via a temp file so readers never see a partial entry"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {path}: {str(e)}")
+
+    def get(self, namespace: str, key: str, ttl: timedelta) -> Optional[pd.DataFrame]:
+        """Return a cached DataFrame, or None if missing/expired"""
+        if not self.enabled:
+            return None
+
+        path = self._path(namespace, key, '.parquet')
+        if not self._fresh(path, ttl):
+            return None
+
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {path}: {str(e)}")
+            return None
+
+    def set(self, namespace: str, key: str, df: pd.DataFrame) -> None:
+        """Store a DataFrame"""
+        if not self.enabled:
+            return
+
+        self._write(self._path(namespace, key, '.parquet'), lambda p: df.to_parquet(p, index=False))
+
+    def get_json(self, namespace: str, key: str, ttl: timedelta) -> Optional[Any]:
+        """Return a cached JSON payload, or None if missing/expired"""
+        if not self.enabled:
+            return None
+
+        path = self._path(namespace, key, '.json')
+        if not self._fresh(path, ttl):
+            return None
+
+        try:
+            return orjson.loads(path.read_bytes())
+        except Exception as e:
+            logger.warning(f"Cache read failed for {path}: {str(e)}")
+            return None
+
+    def set_json(self, namespace: str, key: str, data: Any) -> None:
+        """Store a JSON-serializable payload"""
+        if not self.enabled:
+            return
+
+        self._write(self._path(namespace, key, '.json'), lambda p: p.write_bytes(orjson.dumps(data)))
+
+
+
+class TTLCacheBackend(Backend):
+    """
+    Bounded in-process backend for fastapi-cache
+
+    Entries expire after their route's expire, never outlive the
+    cache-wide ttl, and the least recently used go first at maxsize.
+    Only touched from the event loop, with no await between a read and
+    a write, so no lock is needed.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: int = 900):
+        self._store = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._store.pop(key, None)
+            return None
+        return entry
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        entry = self._get(key)
+        if entry is None:
+            return 0, None
+        expires_at, data = entry
+        return int(min(expires_at - time.time(), self._store.ttl)), data
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._get(key)
+        return entry[1] if entry else None
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        expires_at = time.time() + expire if expire else float('inf')
+        self._store[key] = (expires_at, value)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            keys = [k for k in list(self._store.keys()) if k.startswith(namespace)]
+        elif key:
+            keys = [key] if key in self._store else []
+        else:
+            keys = []
+        for k in keys:
+            self._store.pop(k, None)
+        return len(keys)
+
+
+# Clears in flight; the loop only keeps weak references to its tasks
+_pending_clears = set()
+
+
+def _clear_done(task: asyncio.Task) -> None:
+    _pending_clears.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to clear response cache: {task.exception()}")
+
+
+def invalidate_response_cache() -> None:
+    """
+    Drop cached API responses once new bars are stored
+
+    Scheduled on the running event loop; outside the API process (e.g.
+    setup scripts) there is no response cache initialised to clear.
+    """
+    try:
+        FastAPICache.get_backend()
+        loop = asyncio.get_running_loop()
+    except (AssertionError, RuntimeError):
+        return
+    task = loop.create_task(FastAPICache.clear())
+    _pending_clears.add(task)
+    task.add_done_callback(_clear_done)
+
+
+# Create singleton instance
+file_cache = FileCache()
@@ -8,11 +8,47 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
+import os
+import threading
+from cachetools import TTLCache, cached
+
+from app.cache import file_cache
+from app.utils.calculations import STORED_METRIC_COLUMNS, compute_metrics
 
 logger = logging.getLogger(__name__)
 
 
+# Company metadata changes rarely; Ticker.info takes seconds per symbol
+INFO_CACHE_TTL = timedelta(hours=24)
+
+
+@cached(cache=TTLCache(maxsize=1024, ttl=INFO_CACHE_TTL.total_seconds()), lock=threading.Lock())
+def _fetch_company_info(symbol: str) -> tuple:
+    """
+    Company info as a tuple of items, memoized in-process for a day
+    
+    Backed by the file cache so restarts skip the network too; errors
+    propagate, so failed lookups are not memoized.
+    """
+    cache_key = file_cache.make_key(f"{symbol}:info")
+    company_info = file_cache.get_json('yfinance_info', cache_key, INFO_CACHE_TTL)
+    
+    if company_info is None:
+        info = yf.Ticker(symbol).info
+        company_info = {
+            'symbol': symbol.replace('.NS', '').replace('.BO', ''),
+            'name': info.get('longName', symbol),
+            'sector': info.get('sector', 'Unknown'),
+            'industry': info.get('industry', 'Unknown'),
+            'market_cap': info.get('marketCap', 0)
+        }
+        file_cache.set_json('yfinance_info', cache_key, company_info)
+    
+    return tuple(company_info.items())
+
+
 class DataCollector:
     """Handles data collection and cleaning operations"""
     
@@ -23,9 +59,37 @@ class DataCollector:
         "KOTAKBANK.NS", "WIPRO.NS", "AXISBANK.NS", "ASIANPAINT.NS", "MARUTI.NS"
     ]
     
+    # Tickers per yf.download request
+    DOWNLOAD_CHUNK_SIZE = 20
+    
+    # Concurrent per-symbol requests; bounded to stay clear of Yahoo throttling
+    MAX_WORKERS = 16
+    
+    # Batches this large run the CPU-bound steps in worker processes;
+    # below it, process start-up costs more than it saves
+    PROCESS_POOL_MIN_SYMBOLS = 8
+    MAX_PROCESSES = 8
+    
+    HISTORY_CACHE_TTL = timedelta(minutes=15)
+    
     def __init__(self):
         self.data_cache = {}
     
+    @staticmethod
+    def _history_cache_key(symbol: str, period: str, interval: str) -> str:
+        return file_cache.make_key(f"{symbol}:{period}:{interval}")
+    
+    def _get_cached_history(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Cached raw history with its date index restored, or None"""
+        cached = file_cache.get('yfinance_history', self._history_cache_key(symbol, period, interval), self.HISTORY_CACHE_TTL)
+        if cached is None:
+            return None
+        return cached.set_index(cached.columns[0])
+    
+    def _set_cached_history(self, symbol: str, period: str, interval: str, df: pd.DataFrame) -> None:
+        # The cache stores frames without their index; keep the dates as a column
+        file_cache.set('yfinance_history', self._history_cache_key(symbol, period, interval), df.reset_index())
+    
     def fetch_stock_data(
         self, 
         symbol: str, 
@@ -43,6 +107,11 @@ class DataCollector:
         Returns:
             DataFrame with stock data or None if failed
         """
+        cached = self._get_cached_history(symbol, period, interval)
+        if cached is not None:
+            logger.info(f"💾 Using cached data for {symbol}")
+            return cached
+        
         try:
             logger.info(f"Fetching data for {symbol}")
             ticker = yf.Ticker(symbol)
@@ -52,12 +121,79 @@ class DataCollector:
                 logger.warning(f"No data found for {symbol}")
                 return None
             
+            self._set_cached_history(symbol, period, interval, df)
             return df
         
         except Exception as e:
             logger.error(f"Error fetching data for {symbol}: {str(e)}")
             return None
     
+    def fetch_many(
+        self,
+        symbols: List[str],
+        period: str = "1y",
+        interval: str = "1d"
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch several symbols with batched yf.download calls
+        
+        One request covers up to DOWNLOAD_CHUNK_SIZE tickers instead of one
+        request per symbol.
+        
+        Returns:
+            Dict mapping symbol to its raw history frame; symbols without
+            data are left out
+        """
+        frames = {}
+        misses = []
+        
+        for symbol in symbols:
+            cached = self._get_cached_history(symbol, period, interval)
+            if cached is not None:
+                frames[symbol] = cached
+            else:
+                misses.append(symbol)
+        
+        if len(misses) < len(symbols):
+            logger.info(f"💾 Using cached data for {len(symbols) - len(misses)} symbols")
+        
+        for start in range(0, len(misses), self.DOWNLOAD_CHUNK_SIZE):
+            chunk = misses[start:start + self.DOWNLOAD_CHUNK_SIZE]
+            try:
+                logger.info(f"Fetching data for {len(chunk)} symbols")
+                data = yf.download(
+                    tickers=" ".join(chunk),
+                    period=period,
+                    interval=interval,
+                    group_by='ticker',
+                    auto_adjust=True,
+                    threads=True,
+                    progress=False
+                )
+            except Exception as e:
+                logger.error(f"Error fetching data for {', '.join(chunk)}: {str(e)}")
+                continue
+            
+            for symbol in chunk:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    df = data.xs(symbol, level=0, axis=1)
+                else:
+                    df = data
+                
+                # Rows are aligned across tickers; drop dates this one lacks
+                df = df.dropna(how='all')
+                if df.empty:
+                    logger.warning(f"No data found for {symbol}")
+                    continue
+                
+                df.columns.name = None
+                frames[symbol] = df
+                self._set_cached_history(symbol, period, interval, df)
+        
+        return frames
+    
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Clean and prepare stock data
@@ -67,13 +203,13 @@ class DataCollector:
         2. Remove duplicates
         3. Convert date format
         4. Handle incorrect data types
+        
+        Works in place: the pipeline owns df (fetch_stock_data and
+        fetch_many hand out freshly built frames), so no copy is made.
         """
         if df is None or df.empty:
             return pd.DataFrame()
         
-       
-        df = df.copy()
-        
       
         df.reset_index(inplace=True)
         
@@ -90,8 +226,13 @@ class DataCollector:
         # Remove duplicates based on date
         df.drop_duplicates(subset=['date'], keep='last', inplace=True)
         
-        # Convert date to proper format
-        df['date'] = pd.to_datetime(df['date']).dt.date
+        # Keep dates as datetime64[D] (vectorised compares, no Python date
+        # objects); drop the exchange timezone first so .values doesn't
+        # shift local midnights onto the previous UTC day
+        dates = pd.to_datetime(df['date'])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        df['date'] = dates.to_numpy().astype('datetime64[D]')
         
         # Sort by date
         df.sort_values('date', inplace=True)
@@ -110,30 +251,26 @@ class DataCollector:
         2. 7-day Moving Average
         3. 30-day Moving Average
         4. Daily Volatility (std of returns)
+        
+        Adds the metric columns to df in place and returns it. Frames that
+        already carry the stored metrics are returned as-is.
         """
-        if df.empty:
+        if df.empty or STORED_METRIC_COLUMNS.issubset(df.columns):
             return df
         
-        df = df.copy()
-        
+        # All six metrics in one compiled kernel call over open/close/volume:
         # 1. Daily Return
-        df['daily_return'] = ((df['close'] - df['open']) / df['open'] * 100).round(4)
-        
-        # 2. 7-day Moving Average
-        df['ma7'] = df['close'].rolling(window=7, min_periods=1).mean().round(2)
-        
-        # 3. 30-day Moving Average
-        df['ma30'] = df['close'].rolling(window=30, min_periods=1).mean().round(2)
-        
-        # 4. Daily Volatility (using rolling standard deviation)
-        df['volatility'] = df['daily_return'].rolling(window=20, min_periods=1).std().round(4)
-        
+        # 2-3. 7-day and 30-day Moving Averages
+        # 4. Daily Volatility (20-day rolling std of returns)
         # 5. Custom: Momentum Score (price relative to 30-day MA)
-        df['momentum_score'] = ((df['close'] - df['ma30']) / df['ma30'] * 100).round(2)
-        
         # 6. Custom: Volume Trend (relative to 20-day average)
-        avg_volume = df['volume'].rolling(window=20, min_periods=1).mean()
-        df['volume_trend'] = ((df['volume'] - avg_volume) / avg_volume * 100).round(2)
+        metrics = compute_metrics(
+            df['open'].to_numpy(),
+            df['close'].to_numpy(),
+            df['volume'].to_numpy()
+        )
+        for column, values in metrics.items():
+            df[column] = values
         
         return df
     
@@ -142,12 +279,13 @@ class DataCollector:
         if df.empty:
             return {}
         
-        # Get last 52 weeks of data
+        # Get last 52 weeks of data; dates are sorted by clean_data, so the
+        # cutoff is a binary search and the year is a slice, not a mask
         one_year_ago = datetime.now().date() - timedelta(days=365)
-        df_year = df[pd.to_datetime(df['date']) >= pd.to_datetime(one_year_ago)]
+        dates = df['date'].to_numpy(dtype='datetime64[D]')
+        start = int(np.searchsorted(dates, np.datetime64(one_year_ago, 'D')))
         
-        if df_year.empty:
-            df_year = df
+        df_year = df.iloc[start:] if start < len(df) else df
         
         stats = {
             'week52_high': float(df_year['high'].max()),
@@ -172,33 +310,22 @@ class DataCollector:
         if df1.empty or df2.empty:
             return 0.0
         
-        # Merge dataframes on date
-        merged = pd.merge(
-            df1[['date', 'daily_return']],
-            df2[['date', 'daily_return']],
-            on='date',
-            suffixes=('_1', '_2')
-        )
+        # corr aligns the two date-indexed series itself; no merged frame
+        returns1 = df1.set_index('date')['daily_return']
+        returns2 = df2.set_index('date')['daily_return']
         
-        if merged.empty:
+        correlation = returns1.corr(returns2)
+        
+        # No overlapping dates (or too few to correlate)
+        if pd.isna(correlation):
             return 0.0
         
-        correlation = merged['daily_return_1'].corr(merged['daily_return_2'])
         return round(correlation, 4)
     
     def get_company_info(self, symbol: str) -> Dict:
         """Fetch company information from yfinance"""
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            
-            return {
-                'symbol': symbol.replace('.NS', '').replace('.BO', ''),
-                'name': info.get('longName', symbol),
-                'sector': info.get('sector', 'Unknown'),
-                'industry': info.get('industry', 'Unknown'),
-                'market_cap': info.get('marketCap', 0)
-            }
+            return dict(_fetch_company_info(symbol))
         except Exception as e:
             logger.error(f"Error fetching company info for {symbol}: {str(e)}")
             return {
@@ -209,6 +336,14 @@ class DataCollector:
                 'market_cap': 0
             }
     
+    def get_company_info_many(self, symbols: List[str]) -> List[Dict]:
+        """Fetch company information for several symbols concurrently, in order"""
+        if not symbols:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(symbols))) as executor:
+            return list(executor.map(self.get_company_info, symbols))
+    
     def process_stock(self, symbol: str, period: str = "1y") -> tuple:
         """
         Complete pipeline: fetch, clean, calculate metrics
@@ -240,6 +375,64 @@ class DataCollector:
         stats = self.get_52_week_stats(processed_df)
         
         return processed_df, company_info, stats
+    
+    def process_many(self, symbols: List[str], period: str = "1y") -> Dict[str, tuple]:
+        """
+        process_stock pipeline for several symbols on batched downloads
+        
+        Returns:
+            Dict mapping each requested symbol to (cleaned_df, company_info, stats)
+        """
+        full_symbols = [
+            symbol if symbol.endswith('.NS') or symbol.endswith('.BO') else f"{symbol}.NS"
+            for symbol in symbols
+        ]
+        raw_frames = self.fetch_many(full_symbols, period)
+        
+        # Cleaning and metrics are CPU-bound; spread large batches over cores
+        if len(raw_frames) >= self.PROCESS_POOL_MIN_SYMBOLS:
+            workers = min(self.MAX_PROCESSES, os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outputs = list(executor.map(_process_frame, raw_frames.values()))
+        else:
+            outputs = [_process_frame(raw_df) for raw_df in raw_frames.values()]
+        
+        processed = {
+            full_symbol: output
+            for full_symbol, output in zip(raw_frames, outputs)
+            if output is not None
+        }
+        
+        # Company info is one request per symbol; overlap them
+        infos = dict(zip(processed, self.get_company_info_many(list(processed))))
+        
+        results = {}
+        for symbol, full_symbol in zip(symbols, full_symbols):
+            if full_symbol not in processed:
+                results[symbol] = (None, None, None)
+                continue
+            
+            processed_df, stats = processed[full_symbol]
+            results[symbol] = (processed_df, infos[full_symbol], stats)
+        
+        return results
+
+
+def _process_frame(raw_df: pd.DataFrame) -> Optional[tuple]:
+    """
+    Clean, calculate metrics and stats for one raw history frame
+    
+    Module-level so ProcessPoolExecutor workers can unpickle it.
+    
+    Returns:
+        Tuple of (processed_df, stats), or None if nothing survives cleaning
+    """
+    clean_df = data_collector.clean_data(raw_df)
+    if clean_df.empty:
+        return None
+    
+    processed_df = data_collector.calculate_metrics(clean_df)
+    return processed_df, data_collector.get_52_week_stats(processed_df)
 
 
 # Create singleton instance
@@ -3,22 +3,54 @@ Smart Data Service - Uses Alpha Vantage with database fallback
 """
 
 import os
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import logging
+from sqlalchemy import select
 
-from app.alphavantage_collector import alphavantage_collector
+from app.alphavantage_collector import get_collector
 from app.data_collector import data_collector
-from app.database import SessionLocal
+from app.cache import invalidate_response_cache
+from app.database import SessionLocal, engine
 from app.models import StockData
+from app.utils.calculations import compute_metrics, widen_metrics
+from app.utils.records import df_to_records_fast
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Columns served from the database
+DATA_COLUMNS = [
+    StockData.date,
+    StockData.open,
+    StockData.high,
+    StockData.low,
+    StockData.close,
+    StockData.volume,
+    StockData.daily_return,
+    StockData.ma7,
+    StockData.ma30
+]
+
 
 class DataService:
     """Intelligent data fetching with multiple sources"""
     
+    # StockData columns filled from a processed frame
+    PERSIST_COLUMNS = [
+        'date', 'open', 'high', 'low', 'close', 'volume',
+        'daily_return', 'ma7', 'ma30', 'volatility'
+    ]
+    
+    # Rows per multi-row INSERT; 11 columns keeps each statement well
+    # under SQLite's bound-parameter limit
+    PERSIST_CHUNK_SIZE = 1000
+    
+    # Rows refreshed by update_latest_metrics, and the history the
+    # longest window (ma30) needs on top of them
+    METRICS_REFRESH_ROWS = 30
+    METRICS_LOOKBACK = 29
+    
     def __init__(self):
         self.use_alpha_vantage = os.getenv('ALPHA_VANTAGE_API_KEY') not in [None, '', 'YOUR_API_KEY_HERE']
         logger.info(f"Alpha Vantage enabled: {self.use_alpha_vantage}")
@@ -35,9 +67,10 @@ class DataService:
         if self.use_alpha_vantage:
             logger.info(f"Attempting Alpha Vantage for {symbol}")
             try:
-                df, _, _ = alphavantage_collector.process_stock(symbol, 'compact')
+                df, _, _ = get_collector().process_stock(symbol, 'compact')
                 if df is not None and not df.empty:
                     logger.info(f"✅ Got data from Alpha Vantage for {symbol}")
+                    self.persist(df, symbol)
                     return df.tail(days), 'alpha_vantage'
             except Exception as e:
                 logger.warning(f"Alpha Vantage failed for {symbol}: {str(e)}")
@@ -45,30 +78,21 @@ class DataService:
        
         logger.info(f"Attempting database for {symbol}")
         try:
-            db = SessionLocal()
             cutoff_date = datetime.now().date() - timedelta(days=days)
             
-            data = db.query(StockData).filter(
+            stmt = select(*DATA_COLUMNS).where(
                 StockData.symbol == symbol,
                 StockData.date >= cutoff_date
-            ).order_by(StockData.date).all()
+            ).order_by(StockData.date)
             
-            db.close()
+            # Columnar read straight into typed arrays, no per-row objects
+            db = SessionLocal()
+            try:
+                df = pd.read_sql_query(stmt, db.connection(), parse_dates=['date'])
+            finally:
+                db.close()
             
-            if data:
-                
-                df = pd.DataFrame([{
-                    'date': d.date,
-                    'open': d.open,
-                    'high': d.high,
-                    'low': d.low,
-                    'close': d.close,
-                    'volume': d.volume,
-                    'daily_return': d.daily_return,
-                    'ma7': d.ma7,
-                    'ma30': d.ma30
-                } for d in data])
-                
+            if not df.empty:
                 logger.info(f"✅ Got data from database for {symbol}")
                 return df, 'database'
         except Exception as e:
@@ -81,12 +105,173 @@ class DataService:
             df, _, _ = data_collector.process_stock(full_symbol, f"{days}d")
             if df is not None and not df.empty:
                 logger.info(f"✅ Got data from yfinance for {symbol}")
+                self.persist(df, symbol)
                 return df, 'yfinance'
         except Exception as e:
             logger.warning(f"yfinance failed for {symbol}: {str(e)}")
         
         logger.error(f"❌ All data sources failed for {symbol}")
         return None, None
+    
+    def get_many(self, symbols: List[str], days: int = 30) -> Dict[str, pd.DataFrame]:
+        """
+        Get stock data for several symbols at once
+        
+        One SELECT ... WHERE symbol IN (...) covers everything the database
+        has. The rest go through Alpha Vantage when it is enabled (one
+        rate-limited threaded batch), then a single batched yfinance
+        download; fetched data is persisted.
+        
+        Returns:
+            Dict mapping symbol to dataframe; symbols without data are left out
+        """
+        cutoff_date = datetime.now().date() - timedelta(days=days)
+        
+        stmt = select(StockData.symbol, *DATA_COLUMNS).where(
+            StockData.symbol.in_(symbols),
+            StockData.date >= cutoff_date
+        ).order_by(StockData.symbol, StockData.date)
+        
+        frames = {}
+        try:
+            db = SessionLocal()
+            try:
+                df = pd.read_sql_query(stmt, db.connection(), parse_dates=['date'])
+            finally:
+                db.close()
+            
+            frames = {
+                symbol: group.drop(columns='symbol').reset_index(drop=True)
+                for symbol, group in df.groupby('symbol', sort=False)
+            }
+        except Exception as e:
+            logger.warning(f"Database failed for {', '.join(symbols)}: {str(e)}")
+        
+        missing = [symbol for symbol in symbols if symbol not in frames]
+        if missing and self.use_alpha_vantage:
+            logger.info(f"Attempting Alpha Vantage for {', '.join(missing)}")
+            try:
+                for symbol, (df, _, _) in get_collector().process_many(missing, 'compact').items():
+                    if df is not None and not df.empty:
+                        self.persist(df, symbol)
+                        frames[symbol] = df.tail(days)
+            except Exception as e:
+                logger.warning(f"Alpha Vantage failed for {', '.join(missing)}: {str(e)}")
+        
+        missing = [symbol for symbol in symbols if symbol not in frames]
+        if missing:
+            logger.info(f"Attempting yfinance for {', '.join(missing)}")
+            try:
+                for symbol, (df, _, _) in data_collector.process_many(missing, f"{days}d").items():
+                    if df is not None and not df.empty:
+                        self.persist(df, symbol)
+                        frames[symbol] = df
+            except Exception as e:
+                logger.warning(f"yfinance failed for {', '.join(missing)}: {str(e)}")
+        
+        return {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+    
+    def persist(self, df: pd.DataFrame, symbol: str) -> int:
+        """
+        Store processed bars so later requests are served from the database
+        
+        Metrics computed at ingest are written alongside the prices; dates
+        already stored for the symbol are skipped. Stored metrics are only
+        refreshed when the frame lacked the lookback its new rows need
+        and older bars are stored to supply it.
+        
+        Returns:
+            Number of rows inserted
+        """
+        symbol = symbol.replace('.NS', '').replace('.BO', '')
+        
+        # Pipelines carry datetime64 dates; the Date column stores dates
+        dates = pd.to_datetime(df['date']).dt.date
+        
+        db = SessionLocal()
+        try:
+            existing = {
+                d for (d,) in db.query(StockData.date).filter(
+                    StockData.symbol == symbol,
+                    StockData.date >= dates.min(),
+                    StockData.date <= dates.max()
+                )
+            }
+            has_older = db.query(StockData.id).filter(
+                StockData.symbol == symbol,
+                StockData.date < dates.min()
+            ).first() is not None
+        finally:
+            db.close()
+        
+        is_new = ~dates.isin(existing)
+        new_rows = df.loc[is_new, [c for c in self.PERSIST_COLUMNS if c in df.columns]].assign(date=dates[is_new])
+        if new_rows.empty:
+            return 0
+        
+        # Rows before the first new one are the frame's own lookback
+        needs_refresh = has_older and int(is_new.to_numpy().argmax()) < self.METRICS_LOOKBACK
+        
+        try:
+            # Multi-row INSERTs in one transaction instead of a commit per row
+            with engine.begin() as conn:
+                widen_metrics(new_rows).assign(symbol=symbol).to_sql(
+                    'stock_data', conn, if_exists='append', index=False,
+                    method='multi', chunksize=self.PERSIST_CHUNK_SIZE
+                )
+            if needs_refresh:
+                self.update_latest_metrics(symbol)
+        except Exception as e:
+            logger.warning(f"Failed to persist {symbol}: {str(e)}")
+            return 0
+        
+        invalidate_response_cache()
+        logger.info(f"💾 Stored {len(new_rows)} new records for {symbol}")
+        return len(new_rows)
+    
+    def update_latest_metrics(self, symbol: str) -> int:
+        """
+        Recompute metrics for the most recent rows of a symbol
+        
+        Only the last METRICS_REFRESH_ROWS rows are rewritten, reading just
+        enough history for their rolling windows instead of the full series.
+        
+        Returns:
+            Number of rows updated
+        """
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                StockData.id,
+                StockData.open,
+                StockData.close,
+                StockData.volume
+            ).filter(
+                StockData.symbol == symbol
+            ).order_by(StockData.date.desc()).limit(
+                self.METRICS_REFRESH_ROWS + self.METRICS_LOOKBACK
+            ).all()
+            
+            if not rows:
+                return 0
+            
+            df = pd.DataFrame(rows[::-1], columns=['id', 'open', 'close', 'volume'])
+            df = df.assign(**compute_metrics(
+                df['open'].to_numpy(), df['close'].to_numpy(), df['volume'].to_numpy()
+            )).tail(self.METRICS_REFRESH_ROWS)
+            
+            db.bulk_update_mappings(
+                StockData,
+                df_to_records_fast(df, ['id', 'daily_return', 'ma7', 'ma30', 'volatility'])
+            )
+            db.commit()
+            return len(df)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to update metrics for {symbol}: {str(e)}")
+            return 0
+        finally:
+            db.close()
 
 
 
@@ -2,7 +2,7 @@
 SQLite database configuration and session management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 import os
@@ -12,16 +12,32 @@ from pathlib import Path
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
-# Database URL
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATA_DIR}/stocks.db"
+# Database URL; DATABASE_URL points the app at another SQLite file (tests use a copy)
+SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL', f"sqlite:///{DATA_DIR}/stocks.db")
 
 # Create engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
+    # check_same_thread: needed for SQLite; timeout: wait out a busy writer
+    connect_args={"check_same_thread": False, "timeout": 30},
     echo=False  # Set to True for SQL query logging
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets reads run alongside a write; NORMAL sync is safe under WAL.
+    Temp tables/sorts stay in memory and reads go through a 256MB mmap.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -29,6 +45,29 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def tune_for_bulk_load(db: Session) -> None:
+    """
+    Raise the page cache of db's connection to ~200MB for large inserts
+    
+    For the setup scripts; WAL, synchronous=NORMAL and in-memory temp
+    storage are already set on every connection.
+    """
+    db.execute(text("PRAGMA cache_size=-200000"))
+
+
+def begin_batch(db: Session) -> None:
+    """
+    Open db's transaction with an explicit BEGIN, before any writes
+    
+    pysqlite only begins ahead of DML, so a SAVEPOINT taken first would
+    start a transaction of its own and its RELEASE would commit. After
+    this, per-symbol begin_nested() savepoints nest inside the single
+    commit at the end and a failed one only rolls back its own rows.
+    """
+    if db.get_bind().dialect.name == 'sqlite':
+        db.connection().exec_driver_sql("BEGIN")
+
+
 def get_db():
     """
     Dependency function to get database session
@@ -41,10 +80,54 @@ def get_db():
         db.close()
 
 
+# Indexes superseded by the unique (symbol, date) index
+LEGACY_INDEXES = ('ix_stock_data_id', 'ix_stock_data_symbol', 'ix_stock_data_date')
+
+
+def migrate_db():
+    """
+    Bring an existing stock_data table up to the current indexes
+    
+    create_all skips tables that already exist, so a missing or
+    non-unique idx_symbol_date is (re)built here, after deleting
+    duplicate (symbol, date) rows (the lowest id is kept), and the old
+    single-column indexes are dropped once it exists. Everything runs
+    in one transaction: if any step fails the old indexes stay.
+    """
+    from app.models import StockData
+    
+    with engine.begin() as conn:
+        indexes = {index['name']: index for index in inspect(conn).get_indexes('stock_data')}
+        legacy = [name for name in LEGACY_INDEXES if name in indexes]
+        current = indexes.get('idx_symbol_date')
+        rebuild = current is None or not current['unique']
+        
+        if not legacy and not rebuild:
+            return
+        
+        # pysqlite only opens a transaction ahead of DML; begin explicitly
+        # so the DDL below is rolled back too
+        conn.exec_driver_sql("BEGIN")
+        
+        if rebuild:
+            conn.execute(text(
+                "DELETE FROM stock_data WHERE id NOT IN "
+                "(SELECT MIN(id) FROM stock_data GROUP BY symbol, date)"
+            ))
+            if current is not None:
+                conn.execute(text("DROP INDEX idx_symbol_date"))
+            for index in StockData.__table__.indexes:
+                index.create(conn)
+        
+        for name in legacy:
+            conn.execute(text(f"DROP INDEX {name}"))
+
+
 def init_db():
     """Initialize database with tables"""
     from app.models import Base
     Base.metadata.create_all(bind=engine)
+    migrate_db()
     print("Database initialized successfully!")
 
 
@@ -3,13 +3,21 @@ Financial Data Platform - FastAPI Backend
 Main application entry point with CORS and API configuration
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
 import logging
+import os
 
-from app.database import engine, Base
+from app.database import engine, migrate_db
+from app.models import Base
 from app.api import routes
+from app.cache import TTLCacheBackend
+from app.utils.calculations import warm_up
 
 # Configure logging
 logging.basicConfig(
@@ -18,8 +26,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+def request_key_builder(func, namespace: str = "", *, request=None, response=None, args=(), kwargs=None):
+    """Cache key from the request path and query (the db session is not part of it)"""
+    return f"{namespace}:{request.url.path}?{request.url.query}"
+
+
+# Response cache: Redis when REDIS_URL is set, otherwise bounded in-process memory
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    cache_backend = RedisBackend(aioredis.from_url(REDIS_URL))
+else:
+    cache_backend = TTLCacheBackend(maxsize=2048, ttl=900)
+FastAPICache.init(cache_backend, prefix="fdp", key_builder=request_key_builder)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create/migrate the schema and warm the numba kernels before serving"""
+    Base.metadata.create_all(bind=engine)
+    migrate_db()
+    
+    warm_up()
+    logger.info("🔥 Calculation kernels ready")
+    yield
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,7 +58,9 @@ app = FastAPI(
     description="REST API for financial data analysis and visualization",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -67,7 +100,7 @@ async def health_check():
 async def global_exception_handler(request, exc):
     """Global exception handler"""
     logger.error(f"Unhandled exception: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error occurred"}
     )
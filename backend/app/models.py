@@ -30,21 +30,29 @@ class StockData(Base):
     """Historical stock price data table"""
     __tablename__ = "stock_data"
     
-    id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String(20), index=True, nullable=False)
-    date = Column(Date, index=True, nullable=False)
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20), nullable=False)
+    date = Column(Date, nullable=False)
     open = Column(Float, nullable=False)
     high = Column(Float, nullable=False)
     low = Column(Float, nullable=False)
     close = Column(Float, nullable=False)
     volume = Column(Integer, nullable=False)
-    daily_return = Column(Float)
-    ma7 = Column(Float)  # 7-day moving average
-    ma30 = Column(Float)  # 30-day moving average
-    volatility = Column(Float)  # Daily volatility
+    # Derived metrics are rounded to 2-4 decimals; single precision suffices
+    daily_return = Column(Float(precision=24))
+    ma7 = Column(Float(precision=24))  # 7-day moving average
+    ma30 = Column(Float(precision=24))  # 30-day moving average
+    volatility = Column(Float(precision=24))  # Daily volatility
     
+    # One bar per symbol and day. Serves every "symbol = X AND date >= Y
+    # ORDER BY date" lookup, so symbol and date need no indexes of their
+    # own; on PostgreSQL the INCLUDE columns make it covering (index-only scans)
     __table_args__ = (
-        Index('idx_symbol_date', 'symbol', 'date'),
+        Index(
+            'idx_symbol_date', 'symbol', 'date', unique=True,
+            postgresql_include=['open', 'high', 'low', 'close', 'volume',
+                                'daily_return', 'ma7', 'ma30']
+        ),
     )
     
     def __repr__(self):
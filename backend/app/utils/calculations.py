@@ -4,12 +4,193 @@ Custom calculations and metrics for financial analysis
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict
-from scipy import stats
+from typing import List, Dict, Tuple, Union
+
+try:
+    from numba import njit
+except ImportError:
+    # numba not installed: kernels run as plain Python with identical results
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Price/return inputs accepted by the indicator functions
+ArrayLike = Union[List[float], np.ndarray, pd.Series]
+
+
+# Decimal places the derived metric columns are rounded to; the metrics
+# are held as float32 in memory and widened back at these precisions
+METRIC_DECIMALS = {
+    'daily_return': 4,
+    'ma7': 2,
+    'ma30': 2,
+    'volatility': 4,
+    'momentum_score': 2,
+    'volume_trend': 2
+}
+
+
+# Metrics persisted in StockData; a frame carrying all of them has
+# already been through calculate_metrics (or came from the database)
+STORED_METRIC_COLUMNS = frozenset({'daily_return', 'ma7', 'ma30', 'volatility'})
+
+
+def widen_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with float32 metric columns as float64 at METRIC_DECIMALS
+    
+    Use before serializing or storing, so values like 3713.56 don't come
+    out as 3713.56005859375.
+    """
+    narrow = {c: np.float64 for c in METRIC_DECIMALS if c in df.columns and df[c].dtype == np.float32}
+    if not narrow:
+        return df
+    return df.astype(narrow).round({c: METRIC_DECIMALS[c] for c in narrow})
+
+
+@njit(cache=True, error_model='numpy')
+def _window_mean(values, window, out):
+    """
+    Trailing mean with min_periods=1, reproducing pandas' rolling mean:
+    Kahan-compensated add/remove updates, so values rounded afterwards
+    land on the same side of a tie. Non-finite values are skipped, as
+    pandas treats inf as NaN in rolling windows.
+    """
+    n = values.shape[0]
+    total = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    nobs = 0
+    same_count = 0
+    prev = np.nan
+    
+    for i in range(n):
+        if i >= window and np.isfinite(values[i - window]):
+            y = -values[i - window] - comp_remove
+            t = total + y
+            comp_remove = t - total - y
+            total = t
+            nobs -= 1
+        
+        val = values[i]
+        if np.isfinite(val):
+            y = val - comp_add
+            t = total + y
+            comp_add = t - total - y
+            total = t
+            nobs += 1
+            same_count = same_count + 1 if val == prev else 1
+            prev = val
+        
+        if nobs == 0:
+            out[i] = np.nan
+        else:
+            out[i] = prev if same_count >= nobs else total / nobs
+
+
+@njit(cache=True, error_model='numpy')
+def _window_std(values, window, out):
+    """
+    Trailing sample std with min_periods=1, reproducing pandas' rolling
+    variance updates (compensated Welford add/remove); non-finite values
+    are skipped like in _window_mean
+    """
+    n = values.shape[0]
+    mean = 0.0
+    ssqdm = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    nobs = 0
+    same_count = 0
+    prev = np.nan
+    
+    for i in range(n):
+        if i >= window and np.isfinite(values[i - window]):
+            val = values[i - window]
+            nobs -= 1
+            if nobs:
+                prev_mean = mean - comp_remove
+                y = val - comp_remove
+                t = y - mean
+                comp_remove = t + mean - y
+                mean -= t / nobs
+                ssqdm -= (val - prev_mean) * (val - mean)
+            else:
+                mean = 0.0
+                ssqdm = 0.0
+        
+        val = values[i]
+        if np.isfinite(val):
+            same_count = same_count + 1 if val == prev else 1
+            prev = val
+            nobs += 1
+            prev_mean = mean - comp_add
+            y = val - comp_add
+            t = y - mean
+            comp_add = t + mean - y
+            mean += t / nobs
+            ssqdm += (val - prev_mean) * (val - mean)
+        
+        if nobs < 2:
+            out[i] = np.nan
+        elif same_count >= nobs:
+            out[i] = 0.0
+        else:
+            var = ssqdm / (nobs - 1)
+            out[i] = np.sqrt(var) if var > 0 else 0.0
+
+
+@njit(cache=True, error_model='numpy')
+def _metrics_kernel(open_, close, volume, out_return, out_ma7, out_ma30,
+                    out_volatility, out_momentum, out_volume_trend):
+    # error_model='numpy': a zero open or zero average volume gives
+    # inf/NaN like the pandas columns did, instead of raising
+    n = close.shape[0]
+    
+    for i in range(n):
+        out_return[i] = np.round((close[i] - open_[i]) / open_[i] * 100, 4)
+    
+    _window_mean(close, 7, out_ma7)
+    _window_mean(close, 30, out_ma30)
+    _window_std(out_return, 20, out_volatility)
+    _window_mean(volume, 20, out_volume_trend)
+    
+    for i in range(n):
+        ma30 = np.round(out_ma30[i], 2)
+        out_momentum[i] = (close[i] - ma30) / ma30 * 100
+        avg_volume = out_volume_trend[i]
+        out_volume_trend[i] = (volume[i] - avg_volume) / avg_volume * 100
+
+
+def compute_metrics(open_: np.ndarray, close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Daily return, MA7/MA30, 20-day volatility, momentum and volume trend
+    in one compiled call over the price and volume arrays (a loop per
+    rolling window, no intermediate Series)
+    
+    Windows follow pandas rolling(window, min_periods=1); results are
+    rounded to METRIC_DECIMALS.
+    """
+    open_ = np.ascontiguousarray(open_, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    volume = np.ascontiguousarray(volume, dtype=np.float64)
+    
+    metrics = {column: np.empty_like(close) for column in METRIC_DECIMALS}
+    _metrics_kernel(
+        open_, close, volume,
+        metrics['daily_return'], metrics['ma7'], metrics['ma30'],
+        metrics['volatility'], metrics['momentum_score'], metrics['volume_trend']
+    )
+    
+    for column, decimals in METRIC_DECIMALS.items():
+        np.round(metrics[column], decimals, out=metrics[column])
+    return metrics
 
 
 def calculate_sharpe_ratio(
-    returns: List[float], 
+    returns: ArrayLike, 
     risk_free_rate: float = 0.05
 ) -> float:
     """
@@ -18,7 +199,8 @@ def calculate_sharpe_ratio(
     
     Formula: (Mean Return - Risk Free Rate) / Std Dev of Returns
     """
-    if not returns or len(returns) < 2:
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    if returns.size < 2:
         return 0.0
     
     mean_return = np.mean(returns)
@@ -33,8 +215,8 @@ def calculate_sharpe_ratio(
 
 
 def calculate_beta(
-    stock_returns: List[float], 
-    market_returns: List[float]
+    stock_returns: ArrayLike, 
+    market_returns: ArrayLike
 ) -> float:
     """
     Calculate Beta - measure of stock volatility relative to market
@@ -43,7 +225,9 @@ def calculate_beta(
     Beta < 1: Less volatile than market
     Beta = 1: Moves with market
     """
-    if len(stock_returns) != len(market_returns) or len(stock_returns) < 2:
+    stock_returns = np.ascontiguousarray(stock_returns, dtype=np.float64)
+    market_returns = np.ascontiguousarray(market_returns, dtype=np.float64)
+    if stock_returns.size != market_returns.size or stock_returns.size < 2:
         return 1.0
     
     covariance = np.cov(stock_returns, market_returns)[0][1]
@@ -56,38 +240,76 @@ def calculate_beta(
     return round(beta, 4)
 
 
-def calculate_rsi(prices: List[float], period: int = 14) -> float:
+@njit(cache=True)
+def _ewm_step(average, value, alpha):
+    """One pandas ewm(adjust=False) update, bit-for-bit with pandas' own loop"""
+    if average != value:
+        average = ((1.0 - alpha) * average + alpha * value) / ((1.0 - alpha) + alpha)
+    return average
+
+
+@njit(cache=True)
+def _rsi_impl(changes, period):
     """
-    Calculate Relative Strength Index (RSI)
-    
-    RSI > 70: Overbought
-    RSI < 30: Oversold
+    Wilder-smoothed RSI in a single pass over price changes, reproducing
+    pandas ewm(alpha=1/period, adjust=False) over the gains and losses
     """
-    if len(prices) < period + 1:
-        return 50.0
-    
-
-    deltas = np.diff(prices)
+    alpha = 1.0 / period
+    avg_gain = changes[0] if changes[0] > 0 else 0.0
+    avg_loss = -changes[0] if changes[0] < 0 else 0.0
     
- 
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, -deltas, 0)
-    
-   
-    avg_gain = np.mean(gains[-period:])
-    avg_loss = np.mean(losses[-period:])
+    for i in range(1, changes.shape[0]):
+        gain = changes[i] if changes[i] > 0 else 0.0
+        loss = -changes[i] if changes[i] < 0 else 0.0
+        avg_gain = _ewm_step(avg_gain, gain, alpha)
+        avg_loss = _ewm_step(avg_loss, loss, alpha)
     
     if avg_loss == 0:
         return 100.0
     
     rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+    return 100 - (100 / (1 + rs))
+
+
+@njit(cache=True)
+def _macd_impl(prices, fast, slow, signal):
+    """
+    MACD line and signal line at the last price, reproducing pandas
+    ewm(span=..., adjust=False) for the fast, slow and signal EMAs
+    """
+    alpha_fast = 2.0 / (fast + 1)
+    alpha_slow = 2.0 / (slow + 1)
+    alpha_signal = 2.0 / (signal + 1)
+    ema_fast = prices[0]
+    ema_slow = prices[0]
+    macd_line = 0.0
+    signal_line = 0.0
+    
+    for i in range(1, prices.shape[0]):
+        ema_fast = _ewm_step(ema_fast, prices[i], alpha_fast)
+        ema_slow = _ewm_step(ema_slow, prices[i], alpha_slow)
+        macd_line = ema_fast - ema_slow
+        signal_line = _ewm_step(signal_line, macd_line, alpha_signal)
+    
+    return macd_line, signal_line
+
+
+def calculate_rsi(prices: ArrayLike, period: int = 14) -> float:
+    """
+    Calculate Relative Strength Index (RSI) with Wilder's smoothing
+    
+    RSI > 70: Overbought
+    RSI < 30: Oversold
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if prices.size < period + 1:
+        return 50.0
     
-    return round(rsi, 2)
+    return round(_rsi_impl(np.diff(prices), period), 2)
 
 
 def calculate_macd(
-    prices: List[float], 
+    prices: ArrayLike, 
     fast: int = 12, 
     slow: int = 26, 
     signal: int = 9
@@ -100,33 +322,37 @@ def calculate_macd(
     - signal_line: 9-day EMA of MACD line
     - histogram: MACD - Signal
     """
-    if len(prices) < slow:
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if prices.size < slow:
         return {'macd_line': 0, 'signal_line': 0, 'histogram': 0}
     
-    prices_series = pd.Series(prices)
-    
-    # Calculate EMAs
-    ema_fast = prices_series.ewm(span=fast, adjust=False).mean()
-    ema_slow = prices_series.ewm(span=slow, adjust=False).mean()
-    
-    # MACD line
-    macd_line = ema_fast - ema_slow
-    
-    # Signal line
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    
-    # Histogram
-    histogram = macd_line - signal_line
+    macd_line, signal_line = _macd_impl(prices, fast, slow, signal)
     
     return {
-        'macd_line': round(macd_line.iloc[-1], 2),
-        'signal_line': round(signal_line.iloc[-1], 2),
-        'histogram': round(histogram.iloc[-1], 2)
+        'macd_line': round(macd_line, 2),
+        'signal_line': round(signal_line, 2),
+        'histogram': round(macd_line - signal_line, 2)
     }
 
 
+@njit(cache=True)
+def _bollinger_impl(prices, period):
+    """Mean and population std of the last period prices (Welford)"""
+    n = prices.shape[0]
+    mean = 0.0
+    m2 = 0.0
+    
+    for k in range(period):
+        val = prices[n - period + k]
+        delta = val - mean
+        mean += delta / (k + 1)
+        m2 += delta * (val - mean)
+    
+    return mean, np.sqrt(m2 / period)
+
+
 def calculate_bollinger_bands(
-    prices: List[float], 
+    prices: ArrayLike, 
     period: int = 20, 
     num_std: int = 2
 ) -> Dict[str, float]:
@@ -138,12 +364,11 @@ def calculate_bollinger_bands(
     - middle_band: SMA
     - lower_band: SMA - (std * num_std)
     """
-    if len(prices) < period:
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if prices.size < period:
         return {'upper_band': 0, 'middle_band': 0, 'lower_band': 0}
     
-    recent_prices = prices[-period:]
-    sma = np.mean(recent_prices)
-    std = np.std(recent_prices)
+    sma, std = _bollinger_impl(prices, period)
     
     return {
         'upper_band': round(sma + (std * num_std), 2),
@@ -153,23 +378,64 @@ def calculate_bollinger_bands(
     }
 
 
-def detect_trend(prices: List[float], window: int = 20) -> str:
+@njit(cache=True)
+def _trend_impl(y):
+    """
+    Least-squares line through y against 0..n-1, accumulated Welford-style
+    in one pass; returns (slope, intercept, r_squared)
+    """
+    n = y.shape[0]
+    mean_x = 0.0
+    mean_y = 0.0
+    ss_xx = 0.0
+    ss_yy = 0.0
+    ss_xy = 0.0
+    
+    for i in range(n):
+        k = i + 1
+        dx = i - mean_x
+        dy = y[i] - mean_y
+        mean_x += dx / k
+        mean_y += dy / k
+        ss_xx += dx * (i - mean_x)
+        ss_yy += dy * (y[i] - mean_y)
+        ss_xy += dx * (y[i] - mean_y)
+    
+    slope = ss_xy / ss_xx
+    intercept = mean_y - slope * mean_x
+    
+    if ss_yy <= 0:
+        return slope, intercept, 0.0
+    
+    # Residual sum of squares is ss_yy - slope * ss_xy for a least-squares fit
+    r_squared = slope * ss_xy / ss_yy
+    return slope, intercept, r_squared
+
+
+def _linear_fit(values: ArrayLike) -> Tuple[float, float, float]:
+    """
+    Least-squares line through values against 0..n-1
+    
+    Closed form, no p-value/std-err work. Returns (slope, intercept,
+    r_squared); r_squared is 0 for a flat series.
+    """
+    return _trend_impl(np.ascontiguousarray(values, dtype=np.float64))
+
+
+def detect_trend(prices: ArrayLike, window: int = 20) -> str:
     """
     Detect price trend using linear regression
     
     Returns: 'bullish', 'bearish', or 'neutral'
     """
-    if len(prices) < window:
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if prices.size < window:
         return 'neutral'
     
-    recent_prices = prices[-window:]
-    x = np.arange(len(recent_prices))
-    
     # Linear regression
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, recent_prices)
+    slope, intercept, r_squared = _linear_fit(prices[-window:])
     
     # Determine trend based on slope and R-squared
-    r_squared = r_value ** 2
     
     if r_squared < 0.5:  # Weak correlation
         return 'neutral'
@@ -183,14 +449,16 @@ def detect_trend(prices: List[float], window: int = 20) -> str:
 
 
 def calculate_support_resistance(
-    highs: List[float], 
-    lows: List[float], 
+    highs: ArrayLike, 
+    lows: ArrayLike, 
     window: int = 20
 ) -> Dict[str, float]:
     """
     Calculate support and resistance levels
     """
-    if len(highs) < window or len(lows) < window:
+    highs = np.ascontiguousarray(highs, dtype=np.float64)
+    lows = np.ascontiguousarray(lows, dtype=np.float64)
+    if highs.size < window or lows.size < window:
         return {'resistance': 0, 'support': 0}
     
     recent_highs = highs[-window:]
@@ -205,13 +473,14 @@ def calculate_support_resistance(
     }
 
 
-def calculate_volatility_score(returns: List[float]) -> str:
+def calculate_volatility_score(returns: ArrayLike) -> str:
     """
     Calculate volatility score and classify
     
     Returns: 'low', 'medium', 'high', or 'very_high'
     """
-    if not returns or len(returns) < 2:
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    if returns.size < 2:
         return 'medium'
     
     volatility = np.std(returns) * np.sqrt(252)  # Annualized
@@ -226,7 +495,7 @@ def calculate_volatility_score(returns: List[float]) -> str:
         return 'very_high'
 
 
-def predict_next_price(prices: List[float], method: str = 'linear') -> float:
+def predict_next_price(prices: ArrayLike, method: str = 'linear') -> float:
     """
     Simple price prediction using various methods
     
@@ -235,12 +504,12 @@ def predict_next_price(prices: List[float], method: str = 'linear') -> float:
     - 'ma': Moving average
     - 'ema': Exponential moving average
     """
-    if len(prices) < 10:
-        return prices[-1] if prices else 0
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if prices.size < 10:
+        return prices[-1] if prices.size else 0
     
     if method == 'linear':
-        x = np.arange(len(prices))
-        slope, intercept, _, _, _ = stats.linregress(x, prices)
+        slope, intercept, _ = _linear_fit(prices)
         next_price = slope * len(prices) + intercept
         
     elif method == 'ma':
@@ -254,4 +523,79 @@ def predict_next_price(prices: List[float], method: str = 'linear') -> float:
     else:
         next_price = prices[-1]
     
-    return round(next_price, 2)
\ No newline at end of file
+    return round(next_price, 2)
+
+
+@njit(cache=True)
+def _technicals_kernel(prices, highs, lows, returns, rsi_period, fast, slow, signal, window):
+    n = prices.shape[0]
+    m = returns.shape[0]
+    
+    # Same definitions and short-input fallbacks as calculate_rsi/calculate_macd
+    rsi = 50.0
+    if m >= rsi_period:
+        rsi = _rsi_impl(returns, rsi_period)
+    
+    macd_line = 0.0
+    signal_line = 0.0
+    if n >= slow:
+        macd_line, signal_line = _macd_impl(prices, fast, slow, signal)
+    
+    # Support/resistance over the trailing window
+    start = n - window if n > window else 0
+    support = lows[start]
+    resistance = highs[start]
+    for i in range(start + 1, n):
+        if lows[i] < support:
+            support = lows[i]
+        if highs[i] > resistance:
+            resistance = highs[i]
+    
+    # Next price from the average move over the last 10 bars
+    prediction = prices[n - 1]
+    if n > 10:
+        prediction = prices[n - 1] + (prices[n - 1] - prices[n - 10]) / 10
+    
+    return rsi, macd_line, signal_line, macd_line - signal_line, support, resistance, prediction
+
+
+def compute_technicals(
+    prices: np.ndarray,
+    highs: np.ndarray,
+    lows: np.ndarray,
+    returns: np.ndarray
+) -> Tuple[float, float, float, float, float, float, float]:
+    """
+    RSI, MACD, support/resistance and next-price estimate in one
+    compiled call
+    
+    The kernel makes one loop per indicator: RSI over returns (the same
+    _rsi_impl as calculate_rsi), MACD over prices (_macd_impl, as in
+    calculate_macd), then the min/max of lows/highs over the trailing
+    window; the prediction reads two prices.
+    
+    Returns:
+        (rsi, macd_line, signal_line, histogram, support, resistance, prediction)
+    """
+    return _technicals_kernel(
+        np.ascontiguousarray(prices, dtype=np.float64),
+        np.ascontiguousarray(highs, dtype=np.float64),
+        np.ascontiguousarray(lows, dtype=np.float64),
+        np.ascontiguousarray(returns, dtype=np.float64),
+        14, 12, 26, 9, 20
+    )
+
+
+def warm_up() -> None:
+    """
+    Compile (or load from numba's on-disk cache) every kernel up front,
+    so the first request doesn't pay for JIT compilation
+    """
+    prices = np.linspace(100.0, 120.0, 40)
+    volume = np.full(40, 1000.0)
+    
+    compute_metrics(prices, prices, volume)
+    compute_technicals(prices, prices, prices, np.diff(prices))
+    calculate_rsi(prices)
+    calculate_bollinger_bands(prices)
+    detect_trend(prices)
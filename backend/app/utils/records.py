@@ -0,0 +1,31 @@
+"""
+DataFrame to JSON-ready records, and batching of row lists
+"""
+
+from typing import Dict, Iterator, List, Sequence
+
+import pandas as pd
+
+
+def df_to_records_fast(df: pd.DataFrame, columns: Sequence[str]) -> List[Dict]:
+    """
+    Rows of df as dicts keyed by columns
+    
+    Same result as df[columns].to_dict(orient='records'), but each column
+    is converted to Python values once (tolist) and rows are assembled with
+    zip instead of pandas' per-row boxing.
+    """
+    columns = list(columns)
+    values = [df[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def chunked(rows: Sequence, size: int = 10_000) -> Iterator[Sequence]:
+    """
+    Consecutive slices of rows with at most size items each
+    
+    Keeps a bulk insert within driver parameter limits and memory while
+    still sending thousands of rows per statement.
+    """
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
@@ -7,121 +7,134 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
-from app.database import SessionLocal
-from app.models import StockData
+from app.database import SessionLocal, init_db, tune_for_bulk_load
+from app.utils.records import chunked
 from datetime import datetime, timedelta
-import random
+from functools import lru_cache
+import numpy as np
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT batch
+INSERT_CHUNK_SIZE = 10_000
 
-def generate_realistic_price_data(base_price, days=90):
-    """Generate realistic stock price movements"""
-    data = []
-    current_price = base_price
-    current_date = datetime.now().date() - timedelta(days=days)
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO stock_data "
+    "(symbol, date, open, high, low, close, volume, daily_return, ma7, ma30, volatility) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Symbols and starting prices for the mock data
+MOCK_STOCKS = (
+    ('RELIANCE', 2850.0), ('TCS', 3600.0), ('HDFCBANK', 1650.0),
+    ('INFY', 1450.0), ('HINDUNILVR', 2380.0), ('ICICIBANK', 1050.0),
+    ('BHARTIARTL', 1580.0), ('ITC', 450.0), ('SBIN', 780.0),
+    ('LT', 3500.0), ('KOTAKBANK', 1780.0), ('WIPRO', 580.0),
+    ('AXISBANK', 1150.0), ('ASIANPAINT', 2900.0), ('MARUTI', 12500.0)
+)
+
+
+# Days of history per symbol, and the seed that makes reruns repeatable
+MOCK_DAYS = 90
+MOCK_SEED = 42
+
+
+@lru_cache(maxsize=8)
+def _window_dates(start_date, days):
+    """The window's dates, built once and shared by every symbol"""
+    return tuple((np.datetime64(start_date, 'D') + np.arange(days)).tolist())
+
+
+@lru_cache(maxsize=64)
+def _generate_matrix(base_prices, days, seed):
+    """
+    Mock price columns for several symbols at once
     
-    for i in range(days):
-       
-        daily_change = random.uniform(-0.03, 0.03)
-        trend = random.uniform(-0.002, 0.005)
-        
-        
-        open_price = current_price
-        close_price = open_price * (1 + daily_change + trend)
-        high_price = max(open_price, close_price) * random.uniform(1.005, 1.02)
-        low_price = min(open_price, close_price) * random.uniform(0.98, 0.995)
-        
-        # Volume
-        base_volume = random.randint(2000000, 8000000)
-        volume = int(base_volume * (1 + abs(daily_change) * 10))
-        
-        # Metrics
-        daily_return = ((close_price - open_price) / open_price) * 100
-        ma7 = close_price * random.uniform(0.98, 1.02)
-        ma30 = close_price * random.uniform(0.95, 1.05)
-        volatility = abs(daily_return) * random.uniform(0.8, 1.5)
-        
-        data.append({
-            'date': current_date,
-            'open': round(open_price, 2),
-            'high': round(high_price, 2),
-            'low': round(low_price, 2),
-            'close': round(close_price, 2),
-            'volume': volume,
-            'daily_return': round(daily_return, 4),
-            'ma7': round(ma7, 2),
-            'ma30': round(ma30, 2),
-            'volatility': round(volatility, 4)
-        })
-        
-        current_price = close_price
-        current_date += timedelta(days=1)
+    Every array has shape (len(base_prices), days), one row per symbol;
+    all random draws happen up front and each row's random walk of
+    closes is a cumulative product of its daily growth factors.
+    Returned read-only (they are memoized), in INSERT_SQL column order
+    after 'symbol' and 'date'.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.asarray(base_prices, dtype=np.float64)[:, None]
+    shape = (base.shape[0], days)
+    
+    daily_change = rng.uniform(-0.03, 0.03, shape)
+    trend = rng.uniform(-0.002, 0.005, shape)
+    
+    # Each day opens at the previous close
+    close_price = base * np.cumprod(1 + daily_change + trend, axis=1)
+    open_price = np.concatenate((base, close_price[:, :-1]), axis=1)
+    high_price = np.maximum(open_price, close_price) * rng.uniform(1.005, 1.02, shape)
+    low_price = np.minimum(open_price, close_price) * rng.uniform(0.98, 0.995, shape)
     
-    return data
+    # Volume
+    base_volume = rng.integers(2000000, 8000000, shape, endpoint=True)
+    volume = (base_volume * (1 + np.abs(daily_change) * 10)).astype(np.int64)
+    
+    # Metrics
+    daily_return = ((close_price - open_price) / open_price) * 100
+    ma7 = close_price * rng.uniform(0.98, 1.02, shape)
+    ma30 = close_price * rng.uniform(0.95, 1.05, shape)
+    volatility = np.abs(daily_return) * rng.uniform(0.8, 1.5, shape)
+    
+    columns = (
+        np.round(open_price, 2), np.round(high_price, 2), np.round(low_price, 2),
+        np.round(close_price, 2), volume, np.round(daily_return, 4),
+        np.round(ma7, 2), np.round(ma30, 2), np.round(volatility, 4)
+    )
+    for column in columns:
+        column.flags.writeable = False
+    return columns
 
 
 def populate_mock_data():
     """Populate database with realistic mock data"""
     
-    stocks = {
-        'RELIANCE': 2850.0, 'TCS': 3600.0, 'HDFCBANK': 1650.0,
-        'INFY': 1450.0, 'HINDUNILVR': 2380.0, 'ICICIBANK': 1050.0,
-        'BHARTIARTL': 1580.0, 'ITC': 450.0, 'SBIN': 780.0,
-        'LT': 3500.0, 'KOTAKBANK': 1780.0, 'WIPRO': 580.0,
-        'AXISBANK': 1150.0, 'ASIANPAINT': 2900.0, 'MARUTI': 12500.0
-    }
-    
+    # INSERT OR IGNORE relies on the unique (symbol, date) index
+    init_db()
     db = SessionLocal()
-    total_records = 0
     
     try:
+        tune_for_bulk_load(db)
         logger.info("🎲 Generating mock stock data...")
         logger.info("=" * 60)
         
-        for symbol, base_price in stocks.items():
-            logger.info(f"📊 Generating data for {symbol}...")
-            
-            price_data = generate_realistic_price_data(base_price, days=90)
-            records_added = 0
-            
-            for data_point in price_data:
-                existing = db.query(StockData).filter(
-                    StockData.symbol == symbol,
-                    StockData.date == data_point['date']
-                ).first()
-                
-                if existing:
-                    continue
-                
-                stock_data = StockData(
-                    symbol=symbol,
-                    date=data_point['date'],
-                    open=data_point['open'],
-                    high=data_point['high'],
-                    low=data_point['low'],
-                    close=data_point['close'],
-                    volume=data_point['volume'],
-                    daily_return=data_point['daily_return'],
-                    ma7=data_point['ma7'],
-                    ma30=data_point['ma30'],
-                    volatility=data_point['volatility']
-                )
-                
-                db.add(stock_data)
-                records_added += 1
-            
-            db.commit()
-            total_records += records_added
-            logger.info(f"   ✅ Added {records_added} records for {symbol}")
+        symbols, base_prices = zip(*MOCK_STOCKS)
+        logger.info(f"📊 Generating data for {', '.join(symbols)}...")
+        
+        # Every symbol in one (symbols x days) call, flattened row-major so
+        # each symbol's days stay together
+        columns = _generate_matrix(base_prices, MOCK_DAYS, MOCK_SEED)
+        start_date = datetime.now().date() - timedelta(days=MOCK_DAYS)
+        dates = [day.isoformat() for day in _window_dates(start_date, MOCK_DAYS)]
+        all_rows = list(zip(
+            np.repeat(symbols, MOCK_DAYS).tolist(),
+            dates * len(symbols),
+            *(column.ravel().tolist() for column in columns)
+        ))
+        logger.info(f"   ✅ Generated {len(all_rows)} records")
+        
+        # Parameterized executemany straight on the session's sqlite3
+        # connection, in 10k-row batches and one transaction; the unique
+        # (symbol, date) index skips days that are already stored
+        cursor = db.connection().connection.cursor()
+        total_records = 0
+        try:
+            for chunk in chunked(all_rows, INSERT_CHUNK_SIZE):
+                cursor.executemany(INSERT_SQL, chunk)
+                total_records += cursor.rowcount
+        finally:
+            cursor.close()
+        db.commit()
         
         logger.info("\n" + "=" * 60)
         logger.info("✅ Mock Data Generation Complete!")
         logger.info("=" * 60)
         logger.info(f"📊 Total records added: {total_records}")
-        logger.info(f"📈 Stock data points: {db.query(StockData).count()}")
         logger.info("\n💡 Start API server: cd backend && python run.py")
         logger.info("=" * 60)
         
@@ -9,34 +9,51 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
-from app.database import SessionLocal, init_db
+from app.database import SessionLocal, begin_batch, init_db, tune_for_bulk_load
 from app.models import Company, StockData
 from app.data_collector import data_collector
+from app.utils.records import chunked, df_to_records_fast
 from datetime import datetime
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# StockData columns written by populate_stock_data, with their dtypes
+STOCK_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'int64',
+    'daily_return': 'float64',
+    'ma7': 'float64',
+    'ma30': 'float64',
+    'volatility': 'float64'
+}
+STOCK_COLUMNS = ['symbol', 'date', *STOCK_DTYPES]
+
+# Rows per INSERT batch
+INSERT_CHUNK_SIZE = 10_000
+
 
 def populate_companies(db):
-    """Add companies to database"""
+    """Add companies to database (committed by the caller); returns how many"""
     logger.info("📊 Adding companies to database...")
     
     companies_added = 0
     
+    existing = {s for (s,) in db.query(Company.symbol)}
+    symbols = []
     for symbol in data_collector.INDIAN_STOCKS:
+        if symbol.replace('.NS', '') in existing:
+            logger.info(f"   ⏭️  {symbol} already exists, skipping...")
+        else:
+            symbols.append(symbol)
+    
+    # Network-bound lookups run concurrently; the session stays on this thread
+    for symbol, company_info in zip(symbols, data_collector.get_company_info_many(symbols)):
         try:
-         
-            existing = db.query(Company).filter(Company.symbol == symbol.replace('.NS', '')).first()
-            if existing:
-                logger.info(f"   ⏭️  {symbol} already exists, skipping...")
-                continue
-            
-          
-            company_info = data_collector.get_company_info(symbol)
-            
-         
             company = Company(
                 symbol=company_info['symbol'],
                 name=company_info['name'],
@@ -45,7 +62,9 @@ def populate_companies(db):
                 market_cap=company_info['market_cap']
             )
             
-            db.add(company)
+            # Flushed in its own SAVEPOINT, so one bad row can't fail the session
+            with db.begin_nested():
+                db.add(company)
             companies_added += 1
             logger.info(f"   ✅ Added {company_info['symbol']} - {company_info['name']}")
             
@@ -53,60 +72,56 @@ def populate_companies(db):
             logger.error(f"   ❌ Error adding {symbol}: {str(e)}")
             continue
     
-    db.commit()
     logger.info(f"✅ Added {companies_added} companies!\n")
+    return companies_added
 
 
-def populate_stock_data(db, symbol, days=90):
-    """Add historical stock data for a symbol"""
+def populate_stock_data(db, symbol, days=90, processed=None):
+    """
+    Add historical stock data for a symbol
+    
+    processed: (df, company_info, stats) already fetched by
+    data_collector.process_many; fetched here when omitted
+    
+    Rows are only written once the whole frame converted, and inside a
+    SAVEPOINT, so a symbol with bad data or a failed insert leaves
+    nothing behind; committing is left to the caller.
+    """
     try:
-        logger.info(f"📈 Fetching {days} days of data for {symbol}...")
+        if processed is None:
+            logger.info(f"📈 Fetching {days} days of data for {symbol}...")
+            processed = data_collector.process_stock(symbol, f"{days}d")
         
-  
-        df, company_info, stats = data_collector.process_stock(symbol, f"{days}d")
+        df, company_info, stats = processed
         
         if df is None or df.empty:
             logger.warning(f"   ⚠️  No data available for {symbol}")
             return 0
         
-        records_added = 0
         symbol_clean = symbol.replace('.NS', '').replace('.BO', '')
         
-        for _, row in df.iterrows():
-      
-            existing = db.query(StockData).filter(
-                StockData.symbol == symbol_clean,
-                StockData.date == row['date']
-            ).first()
-            
-            if existing:
-                continue
-            
-          
-            stock_data = StockData(
-                symbol=symbol_clean,
-                date=row['date'],
-                open=float(row['open']),
-                high=float(row['high']),
-                low=float(row['low']),
-                close=float(row['close']),
-                volume=int(row['volume']),
-                daily_return=float(row.get('daily_return', 0)),
-                ma7=float(row.get('ma7', 0)),
-                ma30=float(row.get('ma30', 0)),
-                volatility=float(row.get('volatility', 0))
-            )
-            
-            db.add(stock_data)
-            records_added += 1
+        # One query for the dates already stored, instead of one per row
+        existing_dates = {d for (d,) in db.query(StockData.date).filter(StockData.symbol == symbol_clean)}
+        dates = df['date'].dt.date
+        df = df[~dates.isin(existing_dates)]
         
-        db.commit()
-        logger.info(f"   ✅ Added {records_added} records for {symbol}\n")
-        return records_added
+        # Cast whole columns once instead of float()/int() per field;
+        # metrics missing from the frame default to 0 as before
+        frame = df.reindex(columns=STOCK_COLUMNS, fill_value=0).assign(
+            symbol=symbol_clean,
+            date=dates[df.index]
+        ).astype(STOCK_DTYPES)
+        rows = df_to_records_fast(frame, STOCK_COLUMNS)
+        
+        # Core executemany, one statement per chunk
+        with db.begin_nested():
+            for chunk in chunked(rows, INSERT_CHUNK_SIZE):
+                db.execute(StockData.__table__.insert(), chunk)
+        logger.info(f"   ✅ Added {len(rows)} records for {symbol}\n")
+        return len(rows)
         
     except Exception as e:
         logger.error(f"   ❌ Error processing {symbol}: {str(e)}\n")
-        db.rollback()
         return 0
 
 
@@ -126,24 +141,30 @@ def main():
     db = SessionLocal()
     
     try:
-     
-        populate_companies(db)
+        tune_for_bulk_load(db)
+        begin_batch(db)
+        companies_added = populate_companies(db)
         
     
         logger.info("📊 Fetching historical stock data...")
         logger.info("(This may take a few minutes...)\n")
         
+        symbols = data_collector.INDIAN_STOCKS[:5]
+        processed = data_collector.process_many(symbols, "90d")
+        
         total_records = 0
-        for symbol in data_collector.INDIAN_STOCKS[:5]:  
-            records = populate_stock_data(db, symbol, days=90)
+        for symbol in symbols:  
+            records = populate_stock_data(db, symbol, days=90, processed=processed[symbol])
             total_records += records
         
+        # Companies and every symbol's rows land in one transaction
+        db.commit()
+        
         print("\n" + "=" * 60)
         print("✅ Setup Complete!")
         print("=" * 60)
+        print(f"🏢 Companies added: {companies_added}")
         print(f"📊 Total records added: {total_records}")
-        print(f"🏢 Companies in database: {db.query(Company).count()}")
-        print(f"📈 Stock data points: {db.query(StockData).count()}")
         print("\n💡 You can now start the API server with: python run.py")
         print("=" * 60)
         
@@ -4,6 +4,8 @@ Quick setup with Alpha Vantage - fetches 3 stocks only
 
 import sys
 import os
+import asyncio
+from collections import defaultdict
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
@@ -12,9 +14,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent.parent / 'backend' / '.env')
 
-from app.database import SessionLocal, init_db
+from app.database import SessionLocal, begin_batch, init_db, tune_for_bulk_load
 from app.models import Company, StockData
 from app.alphavantage_collector import AlphaVantageCollector
+from app.utils.calculations import widen_metrics
+from app.utils.records import df_to_records_fast
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -33,62 +37,71 @@ print(f"✅ API Key found: {api_key[:4]}...{api_key[-4:]}")
 collector = AlphaVantageCollector(api_key=api_key)
 init_db()
 db = SessionLocal()
+tune_for_bulk_load(db)
 
 # Fetch 3 US stocks (work better with Alpha Vantage)
 test_stocks = ['AAPL', 'MSFT', 'GOOGL']
 
 print("\n🚀 Fetching 3 stocks from Alpha Vantage (for testing)...\n")
 
-for symbol in test_stocks:
-    try:
-        print(f"📊 Fetching {symbol}...")
-        df, company_info, stats = collector.process_stock(symbol, 'compact')
-        
-        if df is not None and not df.empty:
-          
-            existing = db.query(Company).filter(Company.symbol == symbol).first()
-            if not existing:
-                company = Company(
-                    symbol=symbol,
-                    name=company_info['name'],
-                    sector=company_info['sector'],
-                    industry=company_info['industry'],
-                    market_cap=company_info['market_cap']
-                )
-                db.add(company)
-                db.commit()
-            
-            
-            added = 0
-            for _, row in df.iterrows():
-                existing = db.query(StockData).filter(
-                    StockData.symbol == symbol,
-                    StockData.date == row['date']
-                ).first()
-                
-                if not existing:
-                    stock_data = StockData(
+# StockData columns written per row
+STOCK_COLUMNS = [
+    'symbol', 'date', 'open', 'high', 'low', 'close', 'volume',
+    'daily_return', 'ma7', 'ma30', 'volatility'
+]
+
+# One query each for the companies and the price dates already stored,
+# instead of per-symbol lookups
+existing_companies = {s for (s,) in db.query(Company.symbol).filter(Company.symbol.in_(test_stocks))}
+existing_dates = defaultdict(set)
+for stored_symbol, stored_date in db.query(StockData.symbol, StockData.date).filter(StockData.symbol.in_(test_stocks)):
+    existing_dates[stored_symbol].add(stored_date)
+
+# Requests for all symbols overlap (within the collector's rate limit);
+# the inserts below stay on this thread
+print(f"📊 Fetching {', '.join(test_stocks)}...")
+results = asyncio.run(collector.fetch_many(test_stocks, 'compact'))
+
+try:
+    begin_batch(db)
+    for symbol, (df, company_info, stats) in results.items():
+        try:
+            if df is None or df.empty:
+                print(f"   ⚠️  No data available for {symbol}\n")
+            else:
+                # A SAVEPOINT per symbol: a failed insert only drops that symbol
+                with db.begin_nested():
+                    if symbol not in existing_companies:
+                        db.add(Company(
+                            symbol=symbol,
+                            name=company_info['name'],
+                            sector=company_info['sector'],
+                            industry=company_info['industry'],
+                            market_cap=company_info['market_cap']
+                        ))
+                    
+                    dates = df['date'].dt.date
+                    df = df[~dates.isin(existing_dates[symbol])]
+                    
+                    # Metrics arrive as float32; widen them so 3713.56 isn't stored as
+                    # 3713.56005859375, and default missing ones to 0 as before
+                    frame = widen_metrics(df).reindex(columns=STOCK_COLUMNS, fill_value=0).assign(
                         symbol=symbol,
-                        date=row['date'],
-                        open=float(row['open']),
-                        high=float(row['high']),
-                        low=float(row['low']),
-                        close=float(row['close']),
-                        volume=int(row['volume']),
-                        daily_return=float(row.get('daily_return', 0)),
-                        ma7=float(row.get('ma7', 0)),
-                        ma30=float(row.get('ma30', 0)),
-                        volatility=float(row.get('volatility', 0))
+                        date=dates[df.index]
                     )
-                    db.add(stock_data)
-                    added += 1
+                    rows = df_to_records_fast(frame, STOCK_COLUMNS)
+                    if rows:
+                        db.execute(StockData.__table__.insert(), rows)
+                existing_companies.add(symbol)
+                print(f"   ✅ Added {len(rows)} records for {symbol}\n")
             
-            db.commit()
-            print(f"   ✅ Added {added} records for {symbol}\n")
-        
-    except Exception as e:
-        print(f"   ❌ Error: {str(e)}\n")
+        except Exception as e:
+            print(f"   ❌ Error: {str(e)}\n")
+    
+    # Companies and prices for every symbol in one transaction
+    db.commit()
+finally:
+    db.close()
 
-db.close()
 print("✅ Alpha Vantage test complete!")
-print("💡 Now you have both real (Alpha Vantage) and mock data!")
\ No newline at end of file
+print("💡 Now you have both real (Alpha Vantage) and mock data!")
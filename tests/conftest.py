@@ -0,0 +1,25 @@
+"""
+Shared test setup
+
+The suite runs against a temporary copy of the bundled database and a
+temporary file cache, so running the tests never rewrites
+backend/data/stocks.db (schema migration, WAL mode, inserted rows).
+This module is imported before any test module imports the app.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp_dir = Path(tempfile.mkdtemp(prefix="fdp_tests_"))
+atexit.register(shutil.rmtree, _tmp_dir, ignore_errors=True)
+
+shutil.copy(BACKEND_DIR / 'data' / 'stocks.db', _tmp_dir / 'stocks.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{_tmp_dir / 'stocks.db'}"
+os.environ['FDP_CACHE_DIR'] = str(_tmp_dir / 'cache')
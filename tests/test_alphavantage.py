@@ -0,0 +1,85 @@
+"""
+Alpha Vantage Collector Tests
+Run with: pytest tests/test_alphavantage.py -v
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from app import alphavantage_collector
+from app.alphavantage_collector import AlphaVantageCollector, _CallBudget
+
+
+class FakeResponse:
+    content = b'{"ok": true}'
+    
+    def raise_for_status(self):
+        pass
+    
+    async def read(self):
+        return self.content
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def get(self, url, params=None):
+        return FakeResponse()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestCallBudget:
+    """Test the quota shared by the sync and async request paths"""
+    
+    def test_waits_only_once_quota_is_spent(self, monkeypatch):
+        """Calls within the quota go straight out; the next waits for the window"""
+        clock = FakeClock()
+        monkeypatch.setattr(alphavantage_collector.time, "monotonic", clock)
+        budget = _CallBudget(calls=2, period=60)
+        
+        assert [budget.reserve(), budget.reserve(), budget.reserve()] == [0, 0, 60]
+        
+        clock.now += 30
+        assert budget.reserve() == 30
+        
+        clock.now += 120
+        assert budget.reserve() == 0
+    
+    def test_sync_and_async_paths_share_one_budget(self, monkeypatch):
+        """_get_json and _fetch_json both draw on the module-level budget"""
+        clock = FakeClock()
+        monkeypatch.setattr(alphavantage_collector.time, "monotonic", clock)
+        budget = _CallBudget(calls=1, period=60)
+        monkeypatch.setattr(alphavantage_collector, "_budget", budget)
+        
+        waits = []
+        monkeypatch.setattr(alphavantage_collector.time, "sleep", waits.append)
+        monkeypatch.setattr(alphavantage_collector._session, "get", lambda *args, **kwargs: FakeResponse())
+        alphavantage_collector._get_json({'function': 'OVERVIEW'})
+        
+        async def fetch():
+            real_sleep = asyncio.sleep
+            
+            async def record(delay):
+                waits.append(delay)
+                await real_sleep(0)
+            
+            monkeypatch.setattr(alphavantage_collector.asyncio, "sleep", record)
+            return await AlphaVantageCollector(api_key="test")._fetch_json(FakeSession(), {'function': 'OVERVIEW'})
+        
+        assert asyncio.run(fetch()) == {"ok": True}
+        assert waits == [0, 60]
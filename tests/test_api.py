@@ -13,13 +13,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
 from app.main import app
 
-client = TestClient(app)
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient (and one app startup) shared by the whole suite"""
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 class TestBasicEndpoints:
     """Test basic API endpoints"""
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint returns API info"""
         response = client.get("/")
         assert response.status_code == 200
@@ -28,7 +33,7 @@ class TestBasicEndpoints:
         assert "version" in data
         assert data["version"] == "1.0.0"
     
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test health check endpoint"""
         response = client.get("/health")
         assert response.status_code == 200
@@ -39,7 +44,7 @@ class TestBasicEndpoints:
 class TestCompaniesEndpoint:
     """Test /companies endpoint"""
     
-    def test_get_companies(self):
+    def test_get_companies(self, client):
         """Test getting all companies"""
         response = client.get("/api/v1/companies")
         assert response.status_code == 200
@@ -51,7 +56,7 @@ class TestCompaniesEndpoint:
             assert "symbol" in company
             assert "name" in company
     
-    def test_get_companies_with_sector_filter(self):
+    def test_get_companies_with_sector_filter(self, client):
         """Test filtering companies by sector"""
         response = client.get("/api/v1/companies?sector=IT")
         assert response.status_code == 200
@@ -62,7 +67,7 @@ class TestCompaniesEndpoint:
 class TestStockDataEndpoint:
     """Test /data/{symbol} endpoint"""
     
-    def test_get_stock_data_default_days(self):
+    def test_get_stock_data_default_days(self, client):
         """Test getting stock data with default days"""
         response = client.get("/api/v1/data/RELIANCE")
         assert response.status_code in [200, 404]  
@@ -79,12 +84,12 @@ class TestStockDataEndpoint:
                 assert "low" in item
                 assert "volume" in item
     
-    def test_get_stock_data_custom_days(self):
+    def test_get_stock_data_custom_days(self, client):
         """Test getting stock data with custom days"""
         response = client.get("/api/v1/data/TCS?days=7")
         assert response.status_code in [200, 404]
     
-    def test_get_stock_data_invalid_symbol(self):
+    def test_get_stock_data_invalid_symbol(self, client):
         """Test getting data for invalid symbol"""
         response = client.get("/api/v1/data/INVALID123")
        
@@ -94,7 +99,7 @@ class TestStockDataEndpoint:
 class TestSummaryEndpoint:
     """Test /summary/{symbol} endpoint"""
     
-    def test_get_summary(self):
+    def test_get_summary(self, client):
         """Test getting stock summary"""
         response = client.get("/api/v1/summary/RELIANCE")
         assert response.status_code in [200, 404]
@@ -113,7 +118,7 @@ class TestSummaryEndpoint:
 class TestCompareEndpoint:
     """Test /compare endpoint"""
     
-    def test_compare_stocks(self):
+    def test_compare_stocks(self, client):
         """Test comparing two stocks"""
         response = client.get("/api/v1/compare?symbol1=INFY&symbol2=TCS")
         assert response.status_code in [200, 404, 500]
@@ -126,17 +131,12 @@ class TestCompareEndpoint:
             assert "symbol1_return" in data
             assert "symbol2_return" in data
             assert "better_performer" in data
-    
-    def test_compare_missing_parameters(self):
-        """Test compare endpoint with missing parameters"""
-        response = client.get("/api/v1/compare?symbol1=INFY")
-        assert response.status_code == 422  
 
 
 class TestMoversEndpoint:
     """Test /movers endpoint"""
     
-    def test_get_top_movers(self):
+    def test_get_top_movers(self, client):
         """Test getting top movers"""
         response = client.get("/api/v1/movers")
         assert response.status_code in [200, 500]
@@ -148,7 +148,7 @@ class TestMoversEndpoint:
             assert isinstance(data["gainers"], list)
             assert isinstance(data["losers"], list)
     
-    def test_get_top_movers_custom_limit(self):
+    def test_get_top_movers_custom_limit(self, client):
         """Test getting top movers with custom limit"""
         response = client.get("/api/v1/movers?limit=3")
         assert response.status_code in [200, 500]
@@ -162,7 +162,7 @@ class TestMoversEndpoint:
 class TestTechnicalsEndpoint:
     """Test /technicals/{symbol} endpoint"""
     
-    def test_get_technical_indicators(self):
+    def test_get_technical_indicators(self, client):
         """Test getting technical indicators"""
         response = client.get("/api/v1/technicals/RELIANCE")
         assert response.status_code in [200, 404, 500]
@@ -179,19 +179,13 @@ class TestTechnicalsEndpoint:
 class TestDataValidation:
     """Test data validation and edge cases"""
     
-    def test_negative_days_parameter(self):
-        """Test handling of negative days parameter"""
-        response = client.get("/api/v1/data/RELIANCE?days=-10")
-        assert response.status_code == 422  
-    
-    def test_excessive_days_parameter(self):
-        """Test handling of excessive days parameter"""
-        response = client.get("/api/v1/data/RELIANCE?days=1000")
-        assert response.status_code == 422  
-    
-    def test_invalid_limit_parameter(self):
-        """Test handling of invalid limit in movers"""
-        response = client.get("/api/v1/movers?limit=100")
-        assert response.status_code == 422  
-
-
+    @pytest.mark.parametrize("path", [
+        "/api/v1/data/RELIANCE?days=-10",   # negative days
+        "/api/v1/data/RELIANCE?days=1000",  # excessive days
+        "/api/v1/movers?limit=100",         # invalid movers limit
+        "/api/v1/compare?symbol1=INFY",     # missing symbol2
+    ])
+    def test_invalid_parameters(self, client, path):
+        """Test out-of-range or missing query parameters are rejected"""
+        response = client.get(path)
+        assert response.status_code == 422
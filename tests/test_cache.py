@@ -0,0 +1,142 @@
+"""
+Cache Tests
+Run with: pytest tests/test_cache.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+from fastapi_cache import FastAPICache
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from app import main  # noqa: F401  (initialises FastAPICache)
+from app import cache
+from app.cache import FileCache, TTLCacheBackend, invalidate_response_cache
+from app.data_service import data_service
+
+
+class TestFileCache:
+    """Test the on-disk cache for upstream API results"""
+    
+    def test_round_trip(self, tmp_path):
+        """DataFrames and JSON payloads come back as stored"""
+        file_cache = FileCache(str(tmp_path))
+        df = pd.DataFrame({'close': [1.0, 2.0], 'volume': [10, 20]})
+        file_cache.set("daily", "AAPL", df)
+        file_cache.set_json("overview", "AAPL", {"Name": "Apple"})
+        
+        pd.testing.assert_frame_equal(file_cache.get("daily", "AAPL", timedelta(hours=1)), df)
+        assert file_cache.get_json("overview", "AAPL", timedelta(hours=1)) == {"Name": "Apple"}
+        assert not list(tmp_path.rglob("*.tmp"))
+    
+    def test_entry_expires_after_ttl(self, tmp_path):
+        """Entries older than the TTL are treated as missing"""
+        file_cache = FileCache(str(tmp_path))
+        file_cache.set_json("overview", "AAPL", {"Name": "Apple"})
+        path = tmp_path / "overview" / "AAPL.json"
+        
+        stale = time.time() - 7200
+        os.utime(path, (stale, stale))
+        
+        assert file_cache.get_json("overview", "AAPL", timedelta(hours=1)) is None
+        assert file_cache.get_json("overview", "AAPL", timedelta(hours=3)) == {"Name": "Apple"}
+    
+    def test_empty_root_disables_cache(self, tmp_path, monkeypatch):
+        """FDP_CACHE_DIR='' turns every read and write into a no-op"""
+        monkeypatch.setenv("FDP_CACHE_DIR", "")
+        monkeypatch.chdir(tmp_path)
+        file_cache = FileCache()
+        
+        assert not file_cache.enabled
+        file_cache.set("daily", "AAPL", pd.DataFrame({'close': [1.0]}))
+        file_cache.set_json("overview", "AAPL", {"Name": "Apple"})
+        assert file_cache.get("daily", "AAPL", timedelta(hours=1)) is None
+        assert file_cache.get_json("overview", "AAPL", timedelta(hours=1)) is None
+        assert not list(tmp_path.iterdir())
+    
+    def test_unwritable_root_degrades_to_misses(self, tmp_path, caplog):
+        """A root that can't be created logs a warning instead of raising"""
+        blocker = tmp_path / "not-a-directory"
+        blocker.write_text("")
+        file_cache = FileCache(str(blocker / "cache"))
+        
+        file_cache.set_json("overview", "AAPL", {"Name": "Apple"})
+        
+        assert "Cache write failed" in caplog.text
+        assert file_cache.get_json("overview", "AAPL", timedelta(hours=1)) is None
+
+
+class TestTTLCacheBackend:
+    """Test the in-memory response cache backend"""
+    
+    def test_entry_expires_after_route_expire(self, monkeypatch):
+        """Entries are served until their expire, then dropped"""
+        backend = TTLCacheBackend()
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now)
+        asyncio.run(backend.set("fdp:a", b"payload", expire=60))
+        
+        assert asyncio.run(backend.get("fdp:a")) == b"payload"
+        ttl, data = asyncio.run(backend.get_with_ttl("fdp:a"))
+        assert (ttl, data) == (60, b"payload")
+        
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        assert asyncio.run(backend.get("fdp:a")) is None
+        assert asyncio.run(backend.get_with_ttl("fdp:a")) == (0, None)
+    
+    def test_ttl_is_capped_by_cache_wide_ttl(self):
+        """A route expire longer than the backend ttl reports the backend ttl"""
+        backend = TTLCacheBackend(ttl=30)
+        asyncio.run(backend.set("fdp:a", b"payload", expire=300))
+        
+        ttl, _ = asyncio.run(backend.get_with_ttl("fdp:a"))
+        assert ttl <= 30
+    
+    def test_clear_by_namespace(self):
+        """Clearing a namespace leaves other keys alone"""
+        backend = TTLCacheBackend()
+        asyncio.run(backend.set("fdp:a", b"1"))
+        asyncio.run(backend.set("fdp:b", b"2"))
+        asyncio.run(backend.set("other:c", b"3"))
+        
+        assert asyncio.run(backend.clear(namespace="fdp")) == 2
+        assert asyncio.run(backend.get("fdp:a")) is None
+        assert asyncio.run(backend.get("other:c")) == b"3"
+
+
+class TestResponseCacheInvalidation:
+    """Test that storing new bars drops cached API responses"""
+    
+    def test_persist_clears_cached_responses(self):
+        """DataService.persist clears the response cache on the running loop"""
+        backend = FastAPICache.get_backend()
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-02', '2024-01-03']),
+            'open': [10.0, 11.0],
+            'high': [11.0, 12.0],
+            'low': [9.0, 10.0],
+            'close': [10.5, 11.5],
+            'volume': [1000, 1200]
+        })
+        
+        async def run():
+            await backend.set("fdp:cached-response", b"stale")
+            inserted = data_service.persist(df, 'ZZTEST')
+            # One turn runs the clear, the next its done callback
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            assert not cache._pending_clears
+            return inserted, await backend.get("fdp:cached-response")
+        
+        assert asyncio.run(run()) == (2, None)
+    
+    def test_no_running_loop_is_a_no_op(self):
+        """Outside the event loop (setup scripts) nothing is scheduled"""
+        invalidate_response_cache()
+        assert not cache._pending_clears
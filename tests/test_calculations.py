@@ -0,0 +1,253 @@
+"""
+Calculation Kernel Tests
+Run with: pytest tests/test_calculations.py -v
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from app.alphavantage_collector import AlphaVantageCollector
+from app.data_collector import DataCollector
+from app.utils.calculations import (
+    METRIC_DECIMALS,
+    _linear_fit,
+    calculate_bollinger_bands,
+    calculate_macd,
+    calculate_rsi,
+    compute_metrics,
+    compute_technicals,
+    detect_trend
+)
+
+
+def random_bars(n, seed=0):
+    """Random-walk open/close/volume, with a flat stretch to hit the equal-value paths"""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 2, n).cumsum()
+    open_ = close + rng.normal(0, 1, n)
+    volume = rng.integers(1_000, 1_000_000, n).astype(np.float64)
+    flat = slice(n // 3, n // 3 + min(n // 4, 25))
+    close[flat] = close[n // 3]
+    open_[flat] = close[n // 3]
+    volume[flat] = volume[n // 3]
+    return open_, close, volume
+
+
+def pandas_metrics(open_, close, volume):
+    """The pandas rolling definitions compute_metrics replaces"""
+    df = pd.DataFrame({'open': open_, 'close': close, 'volume': volume})
+    df['daily_return'] = ((df['close'] - df['open']) / df['open'] * 100).round(4)
+    df['ma7'] = df['close'].rolling(window=7, min_periods=1).mean().round(2)
+    df['ma30'] = df['close'].rolling(window=30, min_periods=1).mean().round(2)
+    df['volatility'] = df['daily_return'].rolling(window=20, min_periods=1).std().round(4)
+    df['momentum_score'] = ((df['close'] - df['ma30']) / df['ma30'] * 100).round(2)
+    avg_volume = df['volume'].rolling(window=20, min_periods=1).mean()
+    df['volume_trend'] = ((df['volume'] - avg_volume) / avg_volume * 100).round(2)
+    return df
+
+
+def pandas_rsi(prices, period=14):
+    """The pandas ewm Wilder RSI calculate_rsi replaces"""
+    delta = pd.Series(prices).diff().dropna()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
+    if avg_loss == 0:
+        return 100.0
+    return round(100 - (100 / (1 + avg_gain / avg_loss)), 2)
+
+
+def pandas_macd(prices, fast=12, slow=26, signal=9):
+    """The pandas ewm MACD calculate_macd replaces, unrounded"""
+    series = pd.Series(prices)
+    macd_line = series.ewm(span=fast, adjust=False).mean() - series.ewm(span=slow, adjust=False).mean()
+    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+    return macd_line.iloc[-1], signal_line.iloc[-1]
+
+
+class TestComputeMetrics:
+    """Test the fused metrics kernel against pandas rolling"""
+    
+    @pytest.mark.parametrize("n", [1, 2, 6, 7, 19, 20, 29, 30, 31, 250])
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_pandas_rolling(self, n, seed):
+        """Every metric equals the pandas result exactly, NaNs included"""
+        open_, close, volume = random_bars(n, seed)
+        expected = pandas_metrics(open_, close, volume)
+        
+        metrics = compute_metrics(open_, close, volume)
+        
+        assert set(metrics) == set(METRIC_DECIMALS)
+        for column in METRIC_DECIMALS:
+            np.testing.assert_array_equal(metrics[column], expected[column].to_numpy(), err_msg=column)
+    
+    @pytest.mark.parametrize("open_, close, volume", [
+        ([1.0, 2.0, 3.0], [1.0, 2.0, 3.0], [0.0, 0.0, 5.0]),
+        ([0.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0], [5.0, 0.0, 5.0, 0.0]),
+        ([0.0] * 3 + [5.0] * 37, list(np.arange(1.0, 41.0)), [0.0] * 25 + [3.0] * 15)
+    ])
+    def test_zero_open_and_volume_match_pandas(self, open_, close, volume):
+        """Zero opens and zero volumes give pandas' inf/NaN instead of raising"""
+        open_, close, volume = (np.array(values) for values in (open_, close, volume))
+        expected = pandas_metrics(open_, close, volume)
+        
+        metrics = compute_metrics(open_, close, volume)
+        
+        for column in METRIC_DECIMALS:
+            np.testing.assert_array_equal(metrics[column], expected[column].to_numpy(), err_msg=column)
+    
+    def test_collector_survives_zero_volume(self):
+        """DataCollector.calculate_metrics runs through the kernel on halted days"""
+        open_, close, volume = random_bars(40)
+        volume[:5] = 0
+        df = pd.DataFrame({'open': open_, 'close': close, 'volume': volume})
+        expected = pandas_metrics(open_, close, volume)
+        
+        result = DataCollector().calculate_metrics(df)
+        
+        for column in METRIC_DECIMALS:
+            np.testing.assert_array_equal(result[column].to_numpy(np.float64), expected[column].to_numpy(), err_msg=column)
+    
+    def test_alpha_vantage_pipeline_survives_zero_volume(self, monkeypatch):
+        """AlphaVantageCollector.process_stock gives pandas' metrics, stored as float32"""
+        open_, close, volume = random_bars(40)
+        volume[:5] = 0
+        open_[7] = 0
+        bars = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=40),
+            'open': open_,
+            'high': np.maximum(open_, close) + 1,
+            'low': np.minimum(open_, close) - 1,
+            'close': close,
+            'volume': volume
+        })
+        collector = AlphaVantageCollector(api_key="test")
+        monkeypatch.setattr(collector, "fetch_daily_data", lambda symbol, outputsize: bars.copy())
+        monkeypatch.setattr(collector, "get_company_info", lambda symbol: None)
+        expected = pandas_metrics(open_, close, volume)
+        
+        df, _, stats = collector.process_stock("TEST")
+        
+        for column in METRIC_DECIMALS:
+            np.testing.assert_array_equal(
+                df[column].to_numpy(), expected[column].to_numpy().astype(np.float32), err_msg=column
+            )
+        assert stats['current_price'] == close[-1]
+    
+    def test_first_volatility_is_nan(self):
+        """A single observation has no sample std, as in pandas"""
+        metrics = compute_metrics([10.0, 10.0], [11.0, 12.0], [100.0, 200.0])
+        
+        assert np.isnan(metrics['volatility'][0])
+        assert not np.isnan(metrics['volatility'][1])
+    
+    def test_accepts_series_and_lists(self):
+        """Inputs are coerced to contiguous float64 arrays"""
+        open_, close, volume = random_bars(40)
+        from_series = compute_metrics(pd.Series(open_), pd.Series(close), pd.Series(volume.astype(np.int64)))
+        from_lists = compute_metrics(list(open_), list(close), list(volume))
+        
+        for column in METRIC_DECIMALS:
+            np.testing.assert_array_equal(from_series[column], from_lists[column])
+
+
+
+class TestIndicators:
+    """Test the indicator kernels against their numpy/pandas definitions"""
+    
+    @pytest.mark.parametrize("n", [15, 16, 40, 250])
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_rsi_matches_pandas_ewm(self, n, seed):
+        """Single-pass Wilder smoothing equals pandas ewm exactly"""
+        _, close, _ = random_bars(n, seed)
+        
+        assert calculate_rsi(close) == pandas_rsi(close)
+    
+    def test_rsi_edge_cases(self):
+        """Short input is neutral and a series without losses is 100"""
+        assert calculate_rsi(np.arange(14.0)) == 50.0
+        assert calculate_rsi(np.arange(15.0)) == 100.0
+    
+    @pytest.mark.parametrize("n", [26, 27, 40, 250])
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_macd_matches_pandas_ewm(self, n, seed):
+        """MACD and signal lines equal pandas ewm, n == slow included"""
+        _, close, _ = random_bars(n, seed)
+        macd_line, signal_line = pandas_macd(close)
+        
+        assert calculate_macd(close) == {
+            'macd_line': round(macd_line, 2),
+            'signal_line': round(signal_line, 2),
+            'histogram': round(macd_line - signal_line, 2)
+        }
+    
+    def test_macd_short_input(self):
+        """Fewer than slow prices gives zeros"""
+        assert calculate_macd(np.arange(25.0)) == {'macd_line': 0, 'signal_line': 0, 'histogram': 0}
+    
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_bollinger_matches_numpy(self, seed):
+        """Welford mean/std agree with np.mean/np.std over the last period"""
+        _, close, _ = random_bars(60, seed)
+        bands = calculate_bollinger_bands(close)
+        sma, std = np.mean(close[-20:]), np.std(close[-20:])
+        
+        np.testing.assert_allclose(
+            [bands['upper_band'], bands['middle_band'], bands['lower_band']],
+            [sma + 2 * std, sma, sma - 2 * std],
+            atol=0.01
+        )
+        assert calculate_bollinger_bands(close[:19])['middle_band'] == 0
+    
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_linear_fit_matches_polyfit(self, seed):
+        """One-pass fit agrees with np.polyfit and the squared correlation"""
+        _, close, _ = random_bars(50, seed)
+        x = np.arange(close.size)
+        
+        slope, intercept, r_squared = _linear_fit(close)
+        
+        np.testing.assert_allclose([slope, intercept], np.polyfit(x, close, 1), rtol=1e-9)
+        np.testing.assert_allclose(r_squared, np.corrcoef(x, close)[0, 1] ** 2, rtol=1e-9)
+    
+    def test_trend_edge_cases(self):
+        """Flat and short series are neutral; clean lines follow their slope"""
+        assert _linear_fit(np.full(20, 5.0))[2] == 0.0
+        assert detect_trend(np.full(20, 5.0)) == 'neutral'
+        assert detect_trend(np.arange(19.0)) == 'neutral'
+        assert detect_trend(np.arange(20.0)) == 'bullish'
+        assert detect_trend(np.arange(20.0)[::-1]) == 'bearish'
+
+
+class TestComputeTechnicals:
+    """Test the fused /technicals kernel against the standalone helpers"""
+    
+    @pytest.mark.parametrize("n", [1, 2, 10, 11, 14, 15, 25, 26, 27, 180])
+    @pytest.mark.parametrize("seed", [0, 1])
+    def test_matches_helpers(self, n, seed):
+        """RSI and MACD agree with calculate_rsi/calculate_macd, short inputs included"""
+        open_, close, _ = random_bars(n, seed)
+        highs = np.maximum(open_, close) + 1
+        lows = np.minimum(open_, close) - 1
+        
+        rsi, macd_line, signal_line, histogram, support, resistance, prediction = compute_technicals(
+            close, highs, lows, np.diff(close)
+        )
+        
+        assert round(rsi, 2) == calculate_rsi(close)
+        assert {
+            'macd_line': round(macd_line, 2),
+            'signal_line': round(signal_line, 2),
+            'histogram': round(histogram, 2)
+        } == calculate_macd(close)
+        assert support == lows[-20:].min()
+        assert resistance == highs[-20:].max()
+        if n > 10:
+            assert prediction == close[-1] + (close[-1] - close[-10]) / 10
+        else:
+            assert prediction == close[-1]
@@ -0,0 +1,64 @@
+"""
+Data Service Tests
+Run with: pytest tests/test_data_service.py -v
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from app.data_service import DataService
+
+
+def bars(start, periods):
+    """Processed daily bars as the collectors produce them"""
+    close = np.linspace(100.0, 110.0, periods)
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=periods),
+        'open': close - 0.5,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': np.full(periods, 1000),
+        'daily_return': 0.5,
+        'ma7': close,
+        'ma30': close,
+        'volatility': 0.1
+    })
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """DataService recording update_latest_metrics calls instead of running them"""
+    service = DataService()
+    service.refreshed = []
+    monkeypatch.setattr(service, "update_latest_metrics", service.refreshed.append)
+    return service
+
+
+class TestPersist:
+    """Test DataService.persist on the temporary database"""
+    
+    def test_first_load_skips_metric_refresh(self, service):
+        """With no older bars stored there's nothing to recompute"""
+        assert service.persist(bars('2023-01-01', 40), 'ZZFIRST') == 40
+        assert service.refreshed == []
+    
+    def test_frame_with_lookback_skips_metric_refresh(self, service):
+        """New bars at the end of a long frame already have full windows"""
+        service.persist(bars('2023-01-01', 60), 'ZZLONG')
+        
+        assert service.persist(bars('2023-01-01', 65), 'ZZLONG') == 5
+        assert service.refreshed == []
+    
+    def test_short_frame_after_stored_history_refreshes(self, service):
+        """A short frame appended to stored history gets its windows recomputed"""
+        service.persist(bars('2023-01-01', 60), 'ZZSHORT')
+        
+        assert service.persist(bars('2023-03-02', 5), 'ZZSHORT') == 5
+        assert service.refreshed == ['ZZSHORT']
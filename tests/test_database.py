@@ -0,0 +1,96 @@
+"""
+Schema migration tests
+Run with: pytest tests/test_database.py -v
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from app import database
+from app.models import StockData
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE stock_data (
+    id INTEGER NOT NULL PRIMARY KEY,
+    symbol VARCHAR(20) NOT NULL,
+    date DATE NOT NULL,
+    open FLOAT NOT NULL,
+    high FLOAT NOT NULL,
+    low FLOAT NOT NULL,
+    close FLOAT NOT NULL,
+    volume INTEGER NOT NULL,
+    daily_return FLOAT,
+    ma7 FLOAT,
+    ma30 FLOAT,
+    volatility FLOAT
+);
+CREATE INDEX ix_stock_data_id ON stock_data (id);
+CREATE INDEX ix_stock_data_date ON stock_data (date);
+CREATE INDEX ix_stock_data_symbol ON stock_data (symbol);
+CREATE INDEX idx_symbol_date ON stock_data (symbol, date);
+"""
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A pre-unique-index database holding one duplicated (symbol, date) row"""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany(
+        "INSERT INTO stock_data (symbol, date, open, high, low, close, volume) VALUES (?, ?, 1, 1, 1, 1, 1)",
+        [("TCS", "2024-01-01"), ("TCS", "2024-01-02"), ("TCS", "2024-01-01")]
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "engine", create_engine(f"sqlite:///{path}"))
+    return path
+
+
+def stock_data_state(path):
+    conn = sqlite3.connect(path)
+    try:
+        indexes = sorted(name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_data'"
+        ))
+        ids = [row_id for (row_id,) in conn.execute("SELECT id FROM stock_data ORDER BY id")]
+        return indexes, ids
+    finally:
+        conn.close()
+
+
+class TestMigrateDb:
+    """Test migrate_db on databases created before the unique index"""
+    
+    def test_dedups_and_builds_unique_index(self, legacy_db):
+        """Duplicates keep their lowest id and only the unique index remains"""
+        database.migrate_db()
+        database.migrate_db()  # a second start is a no-op
+        
+        assert stock_data_state(legacy_db) == (['idx_symbol_date'], [1, 2])
+        conn = sqlite3.connect(legacy_db)
+        (sql,) = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'idx_symbol_date'").fetchone()
+        conn.close()
+        assert sql.startswith("CREATE UNIQUE INDEX")
+    
+    def test_failed_migration_keeps_old_indexes(self, legacy_db, monkeypatch):
+        """A failing index build rolls back the delete and every DROP INDEX"""
+        before = stock_data_state(legacy_db)
+        index = next(iter(StockData.__table__.indexes))
+        
+        def fail(bind):
+            raise RuntimeError("index build failed")
+        
+        monkeypatch.setattr(index, "create", fail)
+        with pytest.raises(RuntimeError):
+            database.migrate_db()
+        
+        assert stock_data_state(legacy_db) == before